@@ -1,6 +1,6 @@
 import pytest
 
-from uppi.parsers.address_parser import parse_address
+from uppi.parsers.address_parser import _parse_general, parse_address, scan_many
 
 
 # ---------------------------------------------------------
@@ -251,4 +251,57 @@ def test_parse_address_components(raw, expected):
     assert parsed.piano == expected["piano"]
 
     # Raw-рядок завжди має зберігатися без змін
-    assert parsed.indirizzo_raw == raw
\ No newline at end of file
+    assert parsed.indirizzo_raw == raw
+
+def test_scan_many_matches_parse_address():
+    raws = ["VIA ROMA 10", "PIAZZA CAVOUR n. SNC", "VIA ROMA 10"]
+
+    parsed = scan_many(raws)
+
+    assert parsed == [parse_address(raw) for raw in raws]
+    assert parsed[0] is parsed[2]
+
+
+# ---------------------------------------------------------
+# Швидкий шлях (канонічна форма) == загальний парсер
+# ---------------------------------------------------------
+# Кожна адреса проганяється з маркером "n." і без нього:
+# результат parse_address має збігатися з _parse_general,
+# незалежно від того, який шлях спрацював.
+# ---------------------------------------------------------
+
+_EQUIVALENCE_CASES = [
+    "VIALE DELLA RIVIERA {n}285 Scala U Interno 1 Piano 1",
+    "VIA XX SETTEMBRE {n}15",
+    "VIA MANZONI {n}5 Scala B",
+    "VIA VERDI {n}3 P. 1",
+    "VIA PIANO ALTO {n}10",
+    "VIA SCALA SANTA {n}4",
+    "VIA ROMA {n}5 Piano 1°",
+    "VIA DEI MILLE {n}SNC",
+    "VIA ROMA {n}10/A Interno 3",
+]
+
+
+@pytest.mark.parametrize("template", _EQUIVALENCE_CASES)
+@pytest.mark.parametrize("marker", ["n. ", ""])
+def test_canonical_fast_path_matches_general_parser(template, marker):
+    raw = template.format(n=marker)
+
+    assert parse_address(raw) == _parse_general(" ".join(raw.split()), raw)
+
+
+@pytest.mark.parametrize(
+    "raw, via_name, piano",
+    [
+        # Слово "PIANO" у назві вулиці забирає компонентний regex
+        ("VIA PIANO ALTO n. 10", None, "ALTO"),
+        # "°" не входить у \b-межу — лишається в назві
+        ("VIA ROMA n. 5 Piano 1°", "ROMA °", "1"),
+    ],
+)
+def test_non_canonical_addresses_keep_general_semantics(raw, via_name, piano):
+    parsed = parse_address(raw)
+
+    assert parsed.via_name == via_name
+    assert parsed.piano == piano
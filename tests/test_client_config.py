@@ -1,4 +1,4 @@
-from uppi.config.clients import ClientConfig
+from uppi.config.clients import ClientConfig, client_item_from_raw
 
 
 def test_client_config_from_raw_basic():
@@ -30,3 +30,22 @@ def test_client_config_from_raw_basic():
     assert item["locatore_cf"] == "ABCDEF12G34H567I"
     assert item["immobile_via"] == "Via Roma"
     assert item["a1"] == "X"
+
+
+def test_client_item_from_raw_matches_dataclass_roundtrip():
+    raw = {
+        "LOCATORE_CF": " ABCDEF12G34H567I ",
+        "comune": "ROMA",
+        "FORCE_UPDATE_VISURA": "no",
+        "ISTAT": "1.5",
+        "FOGLIO": 12,
+        "b2": "Y",
+        "CUSTOM_FIELD": "value",
+    }
+    defaults = dict(
+        default_comune="PESCARA",
+        default_tipo_catasto="F",
+        default_ufficio_label="PESCARA Territorio",
+    )
+
+    assert client_item_from_raw(raw, **defaults) == ClientConfig.from_raw(raw, **defaults).to_item_dict()
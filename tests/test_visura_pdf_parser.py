@@ -0,0 +1,125 @@
+import pandas as pd
+
+from uppi.parsers import visura_pdf_parser
+from uppi.parsers.visura_pdf_parser import VisuraParser, _Table
+
+
+# ---------------------------------------------------------
+# Таблиця у формі виводу pdfplumber.extract_tables:
+# порожні комірки — None, заголовки з переносами рядків
+# ---------------------------------------------------------
+
+_PLUMBER_ROWS = [
+    ["", "Foglio", "Numero", "Sub", "Zona\nCens.", "Micro\nzona", "Categoria", "Classe", "Rendita"],
+    ["1", "12", "345", None, None, "2", "A/2", "3", "Euro 512,33"],
+]
+
+
+class _FakePage:
+    def __init__(self, tables=None, error=None):
+        self._tables = tables or []
+        self._error = error
+
+    def extract_tables(self, settings):
+        if self._error is not None:
+            raise self._error
+        return self._tables
+
+
+class _FakePdf:
+    def __init__(self, pages):
+        self.pages = pages
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+def test_process_table_handles_plumber_shaped_rows():
+    table = _Table(pd.DataFrame(_PLUMBER_ROWS).fillna(""))
+
+    parsed = VisuraParser()._process_table(table)
+
+    assert parsed == {
+        "immobili": [
+            {
+                "table_num_immobile": "1",
+                "foglio": "12",
+                "numero": "345",
+                "sub": "",
+                "zona_cens": "",
+                "micro_zona": "2",
+                "categoria": "A/2",
+                "classe": "3",
+                "rendita": "€ 512.33",
+            }
+        ]
+    }
+
+
+def test_read_tables_by_page_skips_failed_page(monkeypatch):
+    fake_pdf = _FakePdf([_FakePage(error=ValueError("broken page")), _FakePage([_PLUMBER_ROWS])])
+    monkeypatch.setattr(visura_pdf_parser.pdfplumber, "open", lambda path: fake_pdf)
+
+    tables_by_page = VisuraParser()._read_tables_by_page("fake.pdf", {1, 2})
+
+    assert list(tables_by_page) == [2]
+    assert tables_by_page[2][0].df.iloc[1, 3] == ""
+
+
+def test_process_table_parses_address_column():
+    rows = [
+        ["", "Foglio", "Numero", "Sub", "Categoria", "Classe", "Indirizzo"],
+        ["1", "12", "345", "6", "A/2", "3", "VIALE DELLA RIVIERA n. 285 Scala U\nInterno 1 Piano 1"],
+        ["2", "12", "346", None, "C/6", "1", "VIA PIANO ALTO n. 10"],
+        ["3", "12", "347", None, "A/2", "2", None],
+    ]
+    table = _Table(pd.DataFrame(rows).fillna(""))
+
+    immobili = VisuraParser()._process_table(table)["immobili"]
+    address_keys = ("via_type", "via_name", "via_num", "scala", "interno", "piano", "indirizzo_raw")
+
+    assert [{k: row[k] for k in address_keys} for row in immobili] == [
+        {
+            "via_type": "VIALE",
+            "via_name": "DELLA RIVIERA",
+            "via_num": "285",
+            "scala": "U",
+            "interno": "1",
+            "piano": "1",
+            # Перенос рядка в комірці стає пробілом
+            "indirizzo_raw": "VIALE DELLA RIVIERA n. 285 Scala U Interno 1 Piano 1",
+        },
+        {
+            "via_type": "VIA",
+            "via_name": None,
+            "via_num": "10",
+            "scala": None,
+            "interno": None,
+            "piano": "ALTO",
+            "indirizzo_raw": "VIA PIANO ALTO n. 10",
+        },
+        {
+            "via_type": None,
+            "via_name": None,
+            "via_num": None,
+            "scala": None,
+            "interno": None,
+            "piano": None,
+            "indirizzo_raw": "",
+        },
+    ]
+
+
+def test_extract_name_cf_stays_on_one_line():
+    parser = VisuraParser()
+
+    assert parser._extract_name_cf("Intestato\n  ROSSI Mario (CF: RSSMRA80A01H501U)\n") == {
+        "locatore_surname": "ROSSI",
+        "locatore_name": "Mario",
+        "cf": "RSSMRA80A01H501U",
+    }
+    # Прізвище й ім'я з різних рядків не склеюються
+    assert parser._extract_name_cf("DATI ANAGRAFICI\nROSSI\nMario (CF: RSSMRA80A01H501U)\n")["cf"] is None
@@ -18,16 +18,28 @@ async def authenticate_user(
     ae_password: str,
     ae_pin: str,
     logger: Any,
+    force: bool = False,
 ) -> bool:
     """
     Залогінитись у AE (Fisconline) на вже завантаженій сторінці логіну.
 
+    Якщо контекст піднятий зі state.json і сесія ще жива (PROFILE_INFO вже є
+    на сторінці) — форму логіну пропускаємо. force=True завжди проходить форму.
+
     Повертає:
         True  - якщо PROIFLE_INFO знайдено (логін вдалий),
         False - якщо сталася помилка / таймаут.
 
     При фейлі видаляє state.json, щоб не залишати битий стейт.
     """
+    if not force:
+        try:
+            await page.wait_for_selector(UppiSelectors.PROFILE_INFO, timeout=2_000)
+            logger.info("[LOGIN] Session from state.json is still valid, skipping login form")
+            return True
+        except PlaywrightTimeoutError:
+            logger.debug("[LOGIN] No active session found, proceeding with login form")
+
     logger.info("[LOGIN] Starting AE authentication via Fisconline tab")
 
     try:
@@ -55,13 +67,14 @@ async def authenticate_user(
             return True
         except PlaywrightTimeoutError as err:
             logger.error("[LOGIN] Profile info not found after login: %s", err)
-            # Якщо стейт існує — видалимо, бо він некоректний
-            if os.path.exists("state.json"):
-                try:
-                    os.remove("state.json")
-                    logger.info("[LOGIN] Removed leftover state.json after failed login")
-                except Exception as rm_err:
-                    logger.warning("[LOGIN] Failed to remove leftover state.json: %s", rm_err)
+            # Стейт (якщо є) некоректний — видаляємо без окремої перевірки exists
+            try:
+                os.remove("state.json")
+                logger.info("[LOGIN] Removed leftover state.json after failed login")
+            except FileNotFoundError:
+                pass
+            except OSError as rm_err:
+                logger.warning("[LOGIN] Failed to remove leftover state.json: %s", rm_err)
             return False
 
     except PlaywrightTimeoutError as err:
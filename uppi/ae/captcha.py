@@ -6,26 +6,52 @@ CAPTCHA handling for SISTER (2Captcha integration).
 - якщо є — зняти скрін, відправити в 2Captcha, заповнити поле й натиснути 'Inoltra'.
 """
 
+import asyncio
 import os
-import base64
-from typing import Any
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
 
+from decouple import config
 from twocaptcha import TwoCaptcha
 from playwright.async_api import Page, TimeoutError as PlaywrightTimeoutError
 
 from uppi.ae.uppi_selectors import UppiSelectors
 
+# Зберігати скріни CAPTCHA в captcha_images/<CF> (для дебагу)
+CAPTCHA_SAVE_IMAGES = config("CAPTCHA_SAVE_IMAGES", default=False, cast=bool)
+CAPTCHA_IMAGES_DIR = Path("captcha_images")
+
+
+def prepare_captcha_dirs(codici_fiscali: Iterable[str]) -> Dict[str, Path]:
+    """
+    Створює captcha_images/<CF> один раз на старті батчу, щоб не робити
+    makedirs на кожній спробі CAPTCHA. Без CAPTCHA_SAVE_IMAGES нічого не створює.
+    """
+    if not CAPTCHA_SAVE_IMAGES:
+        return {}
+
+    dirs: Dict[str, Path] = {}
+    for cf in codici_fiscali:
+        folder = CAPTCHA_IMAGES_DIR / (cf or "unknown_cf")
+        folder.mkdir(parents=True, exist_ok=True)
+        dirs[cf] = folder
+    return dirs
+
 
 async def solve_captcha_if_present(
     page: Page,
     two_captcha_key: str,
     logger: Any,
     codice_fiscale: str = "",
+    captcha_dir: Optional[Path] = None,
 ) -> bool:
     """
     Перевірити, чи є CAPTCHA. Якщо немає — просто тиснемо 'Inoltra' і чекаємо.
     Якщо є — розв'язуємо через 2Captcha.
 
+    captcha_dir — заздалегідь створений каталог з prepare_captcha_dirs().
+
     Повертає:
         True  - якщо або CAPTCHA не було, або її успішно відправили
         False - якщо виникла критична помилка в процесі
@@ -68,6 +94,7 @@ async def solve_captcha_if_present(
             codice_fiscale=codice_fiscale,
             img_captcha_selector=UppiSelectors.IMG_CAPTCHA,
             logger=logger,
+            captcha_dir=captcha_dir,
         )
 
         if not solution:
@@ -101,6 +128,7 @@ async def _solve_captcha(
     codice_fiscale: str,
     img_captcha_selector: str,
     logger: Any,
+    captcha_dir: Optional[Path] = None,
 ) -> str:
     """
     Витягує картинку CAPTCHA, відправляє в 2Captcha та повертає розпізнаний код.
@@ -121,46 +149,60 @@ async def _solve_captcha(
         logger.exception("[CAPTCHA] Unexpected error while locating CAPTCHA: %s", e)
         return None
 
-    # Директорія для скріншотів
-    folder_name = codice_fiscale or "unknown_cf"
-    folder_path = os.path.join("captcha_images", folder_name)
-    try:
-        os.makedirs(folder_path, exist_ok=True)
-    except Exception as e:
-        logger.warning("[CAPTCHA] Cannot create folder for captcha images '%s': %s", folder_path, e)
+    # 2Captcha SDK приймає шлях до файлу і відправляє його multipart-ом
+    # (сирі байти, без base64). Постійно в captcha_images/<CF> зберігаємо
+    # тільки з CAPTCHA_SAVE_IMAGES, інакше — тимчасовий файл.
+    if CAPTCHA_SAVE_IMAGES:
+        if captcha_dir is None:
+            # Каталог не підготували заздалегідь — створюємо тут
+            captcha_dir = CAPTCHA_IMAGES_DIR / (codice_fiscale or "unknown_cf")
+            try:
+                captcha_dir.mkdir(parents=True, exist_ok=True)
+            except Exception as e:
+                logger.warning("[CAPTCHA] Cannot create folder for captcha images '%s': %s", captcha_dir, e)
+        image_path = os.fspath(captcha_dir / "captcha.png")
+    else:
+        fd, image_path = tempfile.mkstemp(prefix="captcha_", suffix=".png")
+        os.close(fd)
 
-    # Робимо скріншот
     try:
-        await playwright_page.wait_for_timeout(3_000)  # невелика пауза перед зняттям скріну
-        image_path = os.path.join(folder_path, "captcha.png")
-        captcha_bytes = await captcha_element.screenshot(path=image_path, type="png")
-        if not captcha_bytes:
-            logger.warning("[CAPTCHA] Failed to get screenshot bytes from CAPTCHA element")
+        # Робимо скріншот
+        try:
+            # Чекаємо, поки картинка реально завантажиться, замість фіксованої паузи
+            await captcha_element.wait_for(state="visible", timeout=10_000)
+            await playwright_page.wait_for_function(
+                "el => el.complete && el.naturalWidth > 0",
+                arg=await captcha_element.element_handle(),
+                timeout=10_000,
+            )
+            captcha_bytes = await captcha_element.screenshot(path=image_path, type="png")
+            if not captcha_bytes:
+                logger.warning("[CAPTCHA] Failed to get screenshot bytes from CAPTCHA element")
+                return None
+            logger.info("[CAPTCHA] Screenshot saved: %s", image_path)
+        except PlaywrightTimeoutError as e:
+            logger.warning("[CAPTCHA] Timeout while taking CAPTCHA screenshot: %s", e)
+            return None
+        except Exception as e:
+            logger.exception("[CAPTCHA] Unexpected error while taking CAPTCHA screenshot: %s", e)
             return None
-        logger.info("[CAPTCHA] Screenshot saved: %s", image_path)
-    except PlaywrightTimeoutError as e:
-        logger.warning("[CAPTCHA] Timeout while taking CAPTCHA screenshot: %s", e)
-        return None
-    except Exception as e:
-        logger.exception("[CAPTCHA] Unexpected error while taking CAPTCHA screenshot: %s", e)
-        return None
-
-    # Конвертуємо у base64
-    try:
-        captcha_base64 = base64.b64encode(captcha_bytes).decode("utf-8")
-    except Exception as e:
-        logger.exception("[CAPTCHA] Failed to encode screenshot to base64: %s", e)
-        return None
 
-    # Відправляємо в 2Captcha
-    try:
-        solver = TwoCaptcha(solver_key)
-        # У деяких версіях TwoCaptcha normal() приймає base64 без параметра 'file'
-        result = solver.normal(captcha_base64)
-        logger.debug("[CAPTCHA] Raw 2Captcha result: %r", result)
-    except Exception as e:
-        logger.error("[CAPTCHA] Error while calling 2Captcha: %s", e)
-        return None
+        # Відправляємо в 2Captcha
+        try:
+            solver = TwoCaptcha(solver_key)
+            # normal() блокує на весь час розв'язання (HTTP + polling) —
+            # виносимо в потік, щоб не зупиняти event loop
+            result = await asyncio.to_thread(solver.normal, image_path)
+            logger.debug("[CAPTCHA] Raw 2Captcha result: %r", result)
+        except Exception as e:
+            logger.error("[CAPTCHA] Error while calling 2Captcha: %s", e)
+            return None
+    finally:
+        if not CAPTCHA_SAVE_IMAGES:
+            try:
+                os.remove(image_path)
+            except OSError:
+                pass
 
     # Витягуємо код
     try:
@@ -6,6 +6,9 @@ Helper для завантаження PDF-візури з SISTER.
 який повертає domain.storage.get_visura_path().
 """
 
+import asyncio
+import os
+import shutil
 from typing import Any
 from pathlib import Path
 
@@ -15,6 +18,15 @@ from uppi.ae.uppi_selectors import UppiSelectors
 from uppi.domain.storage import get_visura_path
 
 
+def _copy_download(src: str, dst: Path) -> None:
+    """
+    Копіює тимчасовий файл Playwright у цільовий шлях.
+    shutil.copyfile на Linux використовує os.sendfile (копіювання в ядрі).
+    """
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    shutil.copyfile(src, dst)
+
+
 async def download_document(
     page: Page,
     codice_fiscale: str,
@@ -34,6 +46,7 @@ async def download_document(
     # формуємо canonical path через storage
     visura_path: Path = get_visura_path(codice_fiscale)
     downloads_dir = visura_path.parent
+    visura_str = os.fspath(visura_path)
 
     logger.info(
         "[DOWNLOAD] Target path for CF=%s → %s (dir=%s)",
@@ -63,9 +76,20 @@ async def download_document(
         return None
 
     try:
-        await download_obj.save_as(str(visura_path))
-        logger.info("[DOWNLOAD] File saved: %s", visura_path)
-        return str(visura_path)
+        # Локальний браузер: копіюємо готовий temp-файл у треді, не блокуючи event loop.
+        # path() недоступний для віддаленого браузера — тоді лишається save_as.
+        try:
+            src = await download_obj.path()
+        except Exception as e:
+            logger.debug("[DOWNLOAD] download.path() unavailable, falling back to save_as: %s", e)
+            src = None
+
+        if src:
+            await asyncio.to_thread(_copy_download, os.fspath(src), visura_path)
+        else:
+            await download_obj.save_as(visura_str)
+        logger.info("[DOWNLOAD] File saved: %s", visura_str)
+        return visura_str
     except Exception as e:
         logger.exception(
             "[DOWNLOAD] Failed to save download to '%s': %s",
@@ -9,7 +9,7 @@ Playwright-хелпери для навігації всередині SISTER п
 from typing import Any, Optional
 
 from decouple import config
-from playwright.async_api import Page, TimeoutError as PlaywrightTimeoutError
+from playwright.async_api import Locator, Page, TimeoutError as PlaywrightTimeoutError
 
 from uppi.ae.uppi_selectors import UppiSelectors
 
@@ -17,6 +17,41 @@ from uppi.ae.uppi_selectors import UppiSelectors
 SISTER_VISURE_CATASTALI_URL = config("SISTER_VISURE_CATASTALI_URL")
 
 
+class SisterForm:
+    """
+    Локатори форми 'Visure catastali' для однієї SISTER-вкладки.
+
+    Створюється один раз на сторінку і перевикористовується для всіх CF,
+    які обробляються в цій вкладці.
+    """
+
+    def __init__(self, page: Page):
+        self.page = page
+        self.ufficio: Locator = page.locator(UppiSelectors.SELECT_UFFICIO)
+        self.catasto: Locator = page.locator(UppiSelectors.SELECT_CATASTO)
+        self.comune: Locator = page.locator(UppiSelectors.SELECT_COMUNE)
+
+
+async def _wait_for_option(
+    select: Locator,
+    *,
+    value: Optional[str] = None,
+    label: Optional[str] = None,
+    timeout: int = 5_000,
+) -> None:
+    """
+    Чекає, поки в <select> з'явиться потрібна <option>.
+
+    Списки catasto/comune SISTER підвантажує після попереднього вибору,
+    тому замість фіксованої паузи чекаємо саме на опцію, яку будемо обирати.
+    """
+    if value is not None:
+        option = select.locator(f'option[value="{value}"]')
+    else:
+        option = select.locator("option", has_text=label)
+    await option.first.wait_for(state="attached", timeout=timeout)
+
+
 async def open_sister_service(
     ae_page: Page,
     servizi_url: str,
@@ -41,7 +76,8 @@ async def open_sister_service(
 
     # Переходимо на сторінку сервісів
     try:
-        await ae_page.goto(servizi_url, wait_until="networkidle", timeout=60_000)
+        # domcontentloaded + явне очікування потрібних селекторів нижче
+        await ae_page.goto(servizi_url, wait_until="domcontentloaded", timeout=60_000)
         logger.debug("[OPEN_SISTER] AE services page loaded")
     except PlaywrightTimeoutError as e:
         logger.error("[OPEN_SISTER] Timeout while navigating to AE services page: %s", e)
@@ -87,11 +123,14 @@ async def open_sister_service(
     # Обробляємо стартову сторінку SISTER: кнопка "Conferma" + збереження state.json
     try:
         await sister_page.wait_for_selector(UppiSelectors.CONFERMA_BUTTON, timeout=10_000)
-        await sister_page.wait_for_timeout(1_000)
         await sister_page.click(UppiSelectors.CONFERMA_BUTTON)
         logger.info("[OPEN_SISTER] 'Conferma' button clicked on SISTER welcome page")
 
-        await sister_page.wait_for_timeout(3_000)
+        # Чекаємо, поки сторінка після 'Conferma' завантажиться, а не фіксовану паузу
+        try:
+            await sister_page.wait_for_load_state("networkidle", timeout=10_000)
+        except PlaywrightTimeoutError:
+            logger.debug("[OPEN_SISTER] networkidle not reached after 'Conferma', continuing")
 
         # Зберігаємо storage_state для повторного використання
         try:
@@ -115,10 +154,13 @@ async def navigate_to_visure_catastali(
     tipo_catasto: str,
     ufficio_label: str,
     logger: Any,
+    form: Optional[SisterForm] = None,
 ) -> bool:
     """
     Перейти до форми 'Visure catastali' та запустити пошук за codice fiscale.
 
+    form — локатори форми для sister_page; якщо не передано, створюються тут.
+
     Якщо все ок:
         - відкритий список омонімів
         - натиснута кнопка 'Visura per soggetto'
@@ -135,9 +177,13 @@ async def navigate_to_visure_catastali(
         ufficio_label,
     )
 
+    if form is None or form.page is not sister_page:
+        form = SisterForm(sister_page)
+
     try:
         # Переходимо напряму на URL форми Visure catastali
-        await sister_page.goto(SISTER_VISURE_CATASTALI_URL, wait_until="networkidle", timeout=60_000)
+        # Далі чекаємо конкретні елементи форми, а не networkidle
+        await sister_page.goto(SISTER_VISURE_CATASTALI_URL, wait_until="domcontentloaded", timeout=60_000)
         logger.debug("[NAVIGATE] Opened Visure catastali URL: %s", SISTER_VISURE_CATASTALI_URL)
 
         # Можливе вікно "Conferma Lettura"
@@ -150,7 +196,7 @@ async def navigate_to_visure_catastali(
 
         # Вибір ufficio
         try:
-            select_ufficio = sister_page.locator(UppiSelectors.SELECT_UFFICIO)
+            select_ufficio = form.ufficio
             await select_ufficio.wait_for(timeout=5_000)
             await select_ufficio.select_option(label=ufficio_label)
             await sister_page.click(UppiSelectors.APLICA_BUTTON)
@@ -164,9 +210,9 @@ async def navigate_to_visure_catastali(
 
         # Вибір типу катасто
         try:
-            select_catasto = sister_page.locator(UppiSelectors.SELECT_CATASTO)
+            select_catasto = form.catasto
             await select_catasto.wait_for(timeout=5_000)
-            await sister_page.wait_for_timeout(1_000)
+            await _wait_for_option(select_catasto, value=tipo_catasto)
             await select_catasto.select_option(value=tipo_catasto)
             logger.info("[NAVIGATE] Catasto type selected: %s", tipo_catasto)
         except PlaywrightTimeoutError as e:
@@ -178,9 +224,9 @@ async def navigate_to_visure_catastali(
 
         # Вибір comune
         try:
-            select_comune = sister_page.locator(UppiSelectors.SELECT_COMUNE)
+            select_comune = form.comune
             await select_comune.wait_for(timeout=5_000)
-            await sister_page.wait_for_timeout(1_000)
+            await _wait_for_option(select_comune, label=comune)
             await select_comune.select_option(label=comune)
             logger.info("[NAVIGATE] Comune selected: %s", comune)
         except PlaywrightTimeoutError as e:
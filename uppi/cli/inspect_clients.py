@@ -1,12 +1,19 @@
 #!/usr/bin/env python3
 import argparse
+import atexit
+import itertools
 import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
 from decouple import config
 import psycopg
 from psycopg.rows import dict_row
+from psycopg_pool import ConnectionPool
 
 from uppi.domain.clients import load_clients
 
@@ -23,136 +30,343 @@ DB_PASSWORD = config("DB_PASSWORD", default="uppi_password")
 
 UPPI_CLIENTS_YAML = config("UPPI_CLIENTS_YAML", default="clients/clients.yml")
 
+# Розмір пулу з'єднань і скільки CF вантажить один потік
+DB_POOL_MAX_SIZE = config("INSPECT_DB_POOL_MAX_SIZE", default=8, cast=int)
+INSPECT_BATCH_SIZE = config("INSPECT_BATCH_SIZE", default=50, cast=int)
+
+# Від скількох immobili контракти читаємо серверним курсором
+SERVER_CURSOR_MIN_IMMOBILI = 200
+
 
 # =========================================================
 # helpers
 # =========================================================
 
-def get_conn() -> psycopg.Connection:
-    try:
-        return psycopg.connect(
-            host=DB_HOST,
-            port=DB_PORT,
-            dbname=DB_NAME,
-            user=DB_USER,
-            password=DB_PASSWORD,
+_POOL: Optional[ConnectionPool] = None
+
+# Буфер виводу CLI (список рядків): скидається в stdout одним join/write на кожен CF
+_BUF: List[str] = []
+
+# Унікальні імена для серверних курсорів (кілька можуть бути відкриті одночасно)
+_CURSOR_SEQ = itertools.count(1)
+
+
+def get_pool() -> ConnectionPool:
+    """
+    Один пул з'єднань на процес: handshake з Postgres робимо один раз,
+    далі з'єднання перевикористовуються. Закривається через atexit.
+    """
+    global _POOL
+    if _POOL is None:
+        pool = ConnectionPool(
+            min_size=1,
+            max_size=DB_POOL_MAX_SIZE,
+            kwargs={
+                "host": DB_HOST,
+                "port": DB_PORT,
+                "dbname": DB_NAME,
+                "user": DB_USER,
+                "password": DB_PASSWORD,
+                "row_factory": dict_row,
+                # повторювані SELECT-и стають prepared statements на сервері
+                "prepare_threshold": 5,
+            },
         )
-    except Exception as e:
-        raise RuntimeError(f"❌ DB connection failed: {e}") from e
+        try:
+            pool.wait(timeout=10.0)
+        except Exception as e:
+            pool.close()
+            raise RuntimeError(f"❌ DB connection failed: {e}") from e
+        atexit.register(pool.close)
+        _POOL = pool
+    return _POOL
+
+
+def get_conn():
+    """Контекст-менеджер: бере з'єднання з пулу і повертає його після виходу."""
+    return get_pool().connection()
+
+
+@contextmanager
+def borrow_conn(conn: Optional[psycopg.Connection] = None) -> Iterator[psycopg.Connection]:
+    """
+    Фетчери можна викликати і з готовим з'єднанням (як у main()), і без нього —
+    тоді з'єднання береться з пулу лише на час запиту (для імпорту з інших модулів).
+    """
+    if conn is not None:
+        yield conn
+        return
+    with get_conn() as pooled:
+        yield pooled
+
+
+def iter_rows(
+    conn,
+    sql: str,
+    params: tuple,
+    itersize: int = 500,
+    server_side: bool = True,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Стрімить рядки пачками по itersize, не матеріалізуючи весь результат.
+
+    server_side=True — серверний (named) курсор: пам'ять клієнта обмежена itersize,
+    ціною зайвого round-trip на DECLARE. Для малих вибірок — звичайний курсор
+    з fetchmany.
+    """
+    if server_side:
+        name = f"inspect_{next(_CURSOR_SEQ)}"
+        with conn.cursor(name=name, row_factory=dict_row) as cur:
+            cur.itersize = itersize
+            cur.execute(sql, params)
+            yield from cur
+        return
+
+    with conn.cursor(row_factory=dict_row) as cur:
+        cur.execute(sql, params)
+        while rows := cur.fetchmany(itersize):
+            yield from rows
+
+
+def _fmt_json(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, indent=2)
+
+
+# Диспетчер форматтерів за точним типом: один dict lookup замість ланцюжка isinstance
+_FORMATTERS: Dict[type, Callable[[Any], str]] = {
+    type(None): lambda v: "—",
+    datetime: lambda v: v.isoformat(sep=" ", timespec="seconds"),
+    dict: _fmt_json,
+    list: _fmt_json,
+}
 
 
 def fmt(value: Any) -> str:
-    if value is None:
-        return "—"
-    if isinstance(value, datetime):
-        return value.isoformat(sep=" ", timespec="seconds")
-    if isinstance(value, (dict, list)):
-        return json.dumps(value, ensure_ascii=False, indent=2)
-    return str(value)
+    return _FORMATTERS.get(type(value), str)(value)
+
+
+def out(line: str = "") -> None:
+    """Додає рядок у буфер виводу (замість print на кожен рядок)."""
+    _BUF.append(f"{line}\n")
+
+
+def flush_out() -> None:
+    """Скидає накопичений буфер у stdout одним записом."""
+    if _BUF:
+        sys.stdout.write("".join(_BUF))
+        sys.stdout.flush()
+        _BUF.clear()
 
 
 def print_kv(key: str, value: Any, indent: int = 2):
     pad = " " * indent
-    print(f"{pad}{key:30}: {fmt(value)}")
+    _BUF.append(f"{pad}{key:30}: {fmt(value)}\n")
 
 
 # =========================================================
 # fetchers
 # =========================================================
 
-def fetch_person(conn, cf: str) -> Optional[Dict[str, Any]]:
-    with conn.cursor(row_factory=dict_row) as cur:
-        cur.execute(
-            """
-            SELECT cf, name, surname, created_at, updated_at
-            FROM persons
-            WHERE cf = %s
-            """,
-            (cf,),
-        )
-        return cur.fetchone()
+# Явні списки колонок (за uppi_schema.sql) замість SELECT *.
+# Аліаси зберігають ключі, які очікують принтери (cf, contract_id).
+VISURA_COLUMNS = (
+    "v.id", "v.locatore_cf AS cf", "v.pdf_bucket", "v.pdf_object",
+    "v.checksum_sha256", "v.fetched_at", "v.updated_at",
+)
+IMMOBILE_COLUMNS = (
+    "i.id", "i.owner_cf", "i.source_visura_id", "i.visura_address_id", "i.real_address_id",
+    "i.sez_urbana", "i.foglio", "i.numero", "i.sub",
+    "i.zona_cens", "i.micro_zona", "i.categoria", "i.classe", "i.consistenza", "i.rendita",
+    "i.superficie_totale", "i.superficie_escluse", "i.superficie_raw",
+    "i.energy_class", "i.created_at", "i.updated_at",
+)
+CONTRACT_COLUMNS = (
+    "c.id AS contract_id", "c.immobile_id", "c.conduttore_cf", "c.contract_kind",
+    "c.start_date", "c.durata_anni", "c.decorrenza_data",
+    "c.registrazione_data", "c.registrazione_num", "c.agenzia_entrate_sede",
+    "c.canone_contrattuale_mensile", "c.istat_rate", "c.arredato_pct",
+    "c.ignore_surcharges", "c.custom_props", "c.created_at", "c.updated_at",
+)
+CANONE_COLUMNS = (
+    "cc.id", "cc.contract_id", "cc.inputs", "cc.min_val", "cc.max_val",
+    "cc.result_mensile", "cc.calculated_at",
+)
+
+
+def _cols(columns: tuple) -> str:
+    return ", ".join(columns)
+
+
+# TIMESTAMPTZ-колонки visure/immobili: у row_to_json/json_agg вони приходять
+# ISO-рядками, тож повертаємо їм datetime, щоб fmt() друкував їх як контракти
+_JSON_TIMESTAMP_KEYS = ("fetched_at", "created_at", "updated_at")
+
+
+def _restore_timestamps(row: Dict[str, Any]) -> Dict[str, Any]:
+    for key in _JSON_TIMESTAMP_KEYS:
+        value = row.get(key)
+        if isinstance(value, str):
+            row[key] = datetime.fromisoformat(value)
+    return row
+
+
+def fetch_clients_tree(
+    cfs: List[str], cur: Optional[psycopg.Cursor] = None
+) -> Dict[str, Dict[str, Any]]:
+    """
+    persons → visura → immobili для всіх CF одним запитом.
 
+    Візура та immobili агрегуються в JSON на боці Postgres (row_to_json /
+    json_agg), тож на кожен CF повертається рівно один рядок:
+    cf → {"person": {...}, "visura": {...} | None, "immobili": [...]}.
 
-def fetch_visura(conn, cf: str) -> Optional[Dict[str, Any]]:
-    with conn.cursor(row_factory=dict_row) as cur:
-        cur.execute(
-            """
-            SELECT *
-            FROM visure
-            WHERE cf = %s
+    cur — спільний курсор з row_factory=dict_row (створюється один раз у main);
+    без нього запит іде через з'єднання з пулу.
+    """
+    if cur is None:
+        with borrow_conn() as conn, conn.cursor(row_factory=dict_row) as own_cur:
+            return fetch_clients_tree(cfs, own_cur)
+
+    cur.execute(
+        f"""
+        SELECT
+            p.cf, p.name, p.surname, p.created_at, p.updated_at,
+            (
+                SELECT row_to_json(x)
+                FROM (SELECT {_cols(VISURA_COLUMNS)} FROM visure v WHERE v.locatore_cf = p.cf) x
+            ) AS visura,
+            COALESCE(
+                (
+                    SELECT json_agg(x ORDER BY x.foglio, x.numero, x.sub, x.id)
+                    FROM (SELECT {_cols(IMMOBILE_COLUMNS)} FROM immobili i WHERE i.owner_cf = p.cf) x
+                ),
+                '[]'::json
+            ) AS immobili
+        FROM persons p
+        WHERE p.cf = ANY(%s::text[])
+        """,
+        (cfs,),
+    )
+    tree: Dict[str, Dict[str, Any]] = {}
+    for row in cur.fetchall():
+        visura = row.pop("visura")
+        if visura is not None:
+            _restore_timestamps(visura)
+        immobili = [_restore_timestamps(imm) for imm in row.pop("immobili")]
+        tree[row["cf"]] = {"person": row, "visura": visura, "immobili": immobili}
+    return tree
+
+
+def group_rows(rows: Iterable[Dict[str, Any]], key: str) -> Dict[Any, List[Dict[str, Any]]]:
+    """Групує рядки за значенням колонки key, зберігаючи порядок з БД."""
+    grouped: Dict[Any, List[Dict[str, Any]]] = {}
+    for row in rows:
+        grouped.setdefault(row[key], []).append(row)
+    return grouped
+
+
+def fetch_contracts_bulk(
+    conn: Optional[psycopg.Connection], immobile_ids: List[int]
+) -> Dict[Any, List[Dict[str, Any]]]:
+    """Контракти для всіх immobili одним запитом: immobile_id → [contract, ...]."""
+    if not immobile_ids:
+        return {}
+    with borrow_conn(conn) as conn:
+        rows = iter_rows(
+            conn,
+            f"""
+            SELECT {_cols(CONTRACT_COLUMNS)}
+            FROM contracts c
+            WHERE c.immobile_id = ANY(%s)
+            ORDER BY c.immobile_id, c.created_at DESC
             """,
-            (cf,),
+            (immobile_ids,),
+            server_side=len(immobile_ids) >= SERVER_CURSOR_MIN_IMMOBILI,
         )
-        return cur.fetchone()
-
+        return group_rows(rows, "immobile_id")
+
+
+_PARTIES_BULK_SQL = """
+    SELECT cp.contract_id, cp.role, p.cf, p.name, p.surname
+    FROM contract_parties cp
+    JOIN persons p ON p.cf = cp.person_cf
+    WHERE cp.contract_id = ANY(%s)
+"""
+
+_CANONE_BULK_SQL = f"""
+    SELECT {_cols(CANONE_COLUMNS)}
+    FROM canone_calcoli cc
+    WHERE cc.contract_id = ANY(%s)
+    ORDER BY cc.contract_id, cc.calculated_at DESC
+"""
+
+_OVERRIDES_BULK_SQL = """
+    SELECT *
+    FROM contract_overrides
+    WHERE contract_id = ANY(%s)
+"""
+
+
+def fetch_contract_details_bulk(
+    conn: Optional[psycopg.Connection], contract_ids: List[str]
+) -> Tuple[
+    Dict[Any, List[Dict[str, Any]]],
+    Dict[Any, List[Dict[str, Any]]],
+    Dict[Any, Dict[str, Any]],
+]:
+    """
+    parties / canone_calcoli / contract_overrides для всіх контрактів.
 
-def fetch_immobili(conn, cf: str) -> List[Dict[str, Any]]:
-    with conn.cursor(row_factory=dict_row) as cur:
-        cur.execute(
-            """
-            SELECT *
-            FROM immobili
-            WHERE visura_cf = %s
-            ORDER BY immobile_comune, foglio, numero, sub, id
-            """,
-            (cf,),
-        )
-        return cur.fetchall()
+    Три незалежні запити йдуть у pipeline-режимі psycopg: відправляються
+    разом, без очікування відповіді на кожен.
 
+    Повертає (parties_by_cid, canoni_by_cid, overrides_by_cid).
+    """
+    if not contract_ids:
+        return {}, {}, {}
 
-def fetch_contracts(conn, immobile_id: int) -> List[Dict[str, Any]]:
-    with conn.cursor(row_factory=dict_row) as cur:
-        cur.execute(
-            """
-            SELECT *
-            FROM contracts
-            WHERE immobile_id = %s
-            ORDER BY created_at DESC
-            """,
-            (immobile_id,),
-        )
-        return cur.fetchall()
+    params = (contract_ids,)
+    with borrow_conn(conn) as conn, conn.pipeline():
+        with conn.cursor(row_factory=dict_row) as cur_parties, \
+                conn.cursor(row_factory=dict_row) as cur_canone, \
+                conn.cursor(row_factory=dict_row) as cur_overrides:
+            cur_parties.execute(_PARTIES_BULK_SQL, params)
+            cur_canone.execute(_CANONE_BULK_SQL, params)
+            cur_overrides.execute(_OVERRIDES_BULK_SQL, params)
 
+            parties_by_cid = group_rows(cur_parties.fetchall(), "contract_id")
+            canoni_by_cid = group_rows(cur_canone.fetchall(), "contract_id")
+            overrides_by_cid = {row["contract_id"]: row for row in cur_overrides.fetchall()}
 
-def fetch_contract_parties(conn, contract_id: str) -> List[Dict[str, Any]]:
-    with conn.cursor(row_factory=dict_row) as cur:
-        cur.execute(
-            """
-            SELECT cp.role, p.cf, p.name, p.surname
-            FROM contract_parties cp
-            JOIN persons p ON p.cf = cp.person_cf
-            WHERE cp.contract_id = %s
-            """,
-            (contract_id,),
-        )
-        return cur.fetchall()
+    return parties_by_cid, canoni_by_cid, overrides_by_cid
 
 
-def fetch_canone(conn, contract_id: str) -> List[Dict[str, Any]]:
-    with conn.cursor(row_factory=dict_row) as cur:
-        cur.execute(
-            """
-            SELECT *
-            FROM canone_calcoli
-            WHERE contract_id = %s
-            ORDER BY created_at DESC
-            """,
-            (contract_id,),
-        )
-        return cur.fetchall()
+@dataclass
+class InspectBatch:
+    """Усі дані з БД для пачки CF, готові для принтерів."""
+    tree: Dict[str, Dict[str, Any]]
+    contracts_by_imm: Dict[Any, List[Dict[str, Any]]]
+    parties_by_cid: Dict[Any, List[Dict[str, Any]]]
+    canoni_by_cid: Dict[Any, List[Dict[str, Any]]]
+    overrides_by_cid: Dict[Any, Dict[str, Any]]
 
 
-def fetch_overrides(conn, contract_id: str) -> Optional[Dict[str, Any]]:
-    with conn.cursor(row_factory=dict_row) as cur:
-        cur.execute(
-            """
-            SELECT *
-            FROM contract_overrides
-            WHERE contract_id = %s
-            """,
-            (contract_id,),
+def load_inspect_batch(cfs: List[str]) -> InspectBatch:
+    """
+    Вантажить пачку CF на власному з'єднанні з пулу (можна викликати з потоків):
+    дерево persons → visura → immobili, далі контракти та залежні таблиці.
+    """
+    with borrow_conn() as conn, conn.cursor(row_factory=dict_row) as cur:
+        tree = fetch_clients_tree(cfs, cur)
+
+        immobile_ids = [imm["id"] for node in tree.values() for imm in node["immobili"]]
+        contracts_by_imm = fetch_contracts_bulk(conn, immobile_ids)
+        contract_ids = [c["contract_id"] for rows in contracts_by_imm.values() for c in rows]
+        parties_by_cid, canoni_by_cid, overrides_by_cid = fetch_contract_details_bulk(
+            conn, contract_ids
         )
-        return cur.fetchone()
+
+    return InspectBatch(tree, contracts_by_imm, parties_by_cid, canoni_by_cid, overrides_by_cid)
 
 
 # =========================================================
@@ -163,7 +377,7 @@ def print_block_1_yaml_hint(cf: str, imm: Dict[str, Any]):
     """
     BLOCK 1 — тільки те, що має сенс для clients.yml
     """
-    print("  🔹 BLOCK 1 — Дані для clients.yml")
+    out("  🔹 BLOCK 1 — Дані для clients.yml")
     print_kv("LOCATORE_CF", cf, 4)
     print_kv("IMMOBILE_COMUNE", imm.get("immobile_comune"), 4)
     print_kv("IMMOBILE_FOGLIO", imm.get("foglio"), 4)
@@ -174,44 +388,107 @@ def print_block_1_yaml_hint(cf: str, imm: Dict[str, Any]):
 def print_block_2_full_dump(
     imm: Dict[str, Any],
     contracts: List[Dict[str, Any]],
-    conn: psycopg.Connection,
+    parties_by_cid: Dict[Any, List[Dict[str, Any]]],
+    canoni_by_cid: Dict[Any, List[Dict[str, Any]]],
+    overrides_by_cid: Dict[Any, Dict[str, Any]],
 ):
-    print("  🔸 BLOCK 2 — Вся інформація з БД")
+    out("  🔸 BLOCK 2 — Вся інформація з БД")
 
-    print("    ▸ IMMOBILE")
+    out("    ▸ IMMOBILE")
     for k, v in imm.items():
         print_kv(k, v, 6)
 
     if not contracts:
-        print("    ▸ CONTRACTS: — (немає)")
+        out("    ▸ CONTRACTS: — (немає)")
         return
 
     for cidx, contract in enumerate(contracts, start=1):
-        print(f"    ▸ CONTRACT [{cidx}] {contract['contract_id']}")
+        cid = contract["contract_id"]
+        out(f"    ▸ CONTRACT [{cidx}] {cid}")
         for k, v in contract.items():
             print_kv(k, v, 8)
 
-        parties = fetch_contract_parties(conn, contract["contract_id"])
-        print("        ▸ PARTIES")
-        for p in parties:
+        out("        ▸ PARTIES")
+        for p in parties_by_cid.get(cid, ()):
             print_kv(f"{p['role']}", f"{p['name']} {p['surname']} ({p['cf']})", 10)
 
-        canoni = fetch_canone(conn, contract["contract_id"])
+        canoni = canoni_by_cid.get(cid)
         if canoni:
-            print("        ▸ CANONE_CALCOLI")
+            out("        ▸ CANONE_CALCOLI")
             for calc in canoni:
                 for k, v in calc.items():
                     print_kv(k, v, 10)
         else:
-            print("        ▸ CANONE_CALCOLI: —")
+            out("        ▸ CANONE_CALCOLI: —")
 
-        overrides = fetch_overrides(conn, contract["contract_id"])
+        overrides = overrides_by_cid.get(cid)
         if overrides:
-            print("        ▸ CONTRACT_OVERRIDES")
+            out("        ▸ CONTRACT_OVERRIDES")
             for k, v in overrides.items():
                 print_kv(k, v, 10)
 
 
+def print_client(
+    idx: int,
+    cf: str,
+    node: Optional[Dict[str, Any]],
+    contracts_by_imm: Dict[Any, List[Dict[str, Any]]],
+    parties_by_cid: Dict[Any, List[Dict[str, Any]]],
+    canoni_by_cid: Dict[Any, List[Dict[str, Any]]],
+    overrides_by_cid: Dict[Any, Dict[str, Any]],
+):
+    out("=" * 80)
+    out(f"[{idx}] CF: {cf}")
+    out("=" * 80)
+
+    node = node or {}
+    person = node.get("person")
+    visura = node.get("visura")
+    immobili = node.get("immobili") or []
+
+    # ---------- PERSON ----------
+    if not person:
+        out(f"❌ PERSONS: CF {cf} не знайдено в БД")
+        return
+
+    out(f"Locatore: {person.get('name')} {person.get('surname')}")
+
+    # ---------- VISURA ----------
+    if not visura:
+        out("❌ VISURA: відсутня (потрібно запускати спайдер)")
+        return
+
+    out("\nVISURA:")
+    for k, v in visura.items():
+        print_kv(k, v, 2)
+
+    # ---------- IMMOBILI ----------
+    out(f"\nIMMOBILI: {len(immobili)}")
+
+    if not immobili:
+        out("⚠️ Візура є, але immobili відсутні")
+        return
+
+    for imm_idx, imm in enumerate(immobili, start=1):
+        out("\n" + "-" * 80)
+        out(f"IMMOBILE [{imm_idx}] id={imm.get('id')}")
+        out("-" * 80)
+
+        # Блок 1 — підказка для clients.yml
+        print_block_1_yaml_hint(cf, imm)
+
+        # Блок 2 — повний дамп з БД
+        print_block_2_full_dump(
+            imm,
+            contracts_by_imm.get(imm["id"], []),
+            parties_by_cid,
+            canoni_by_cid,
+            overrides_by_cid,
+        )
+
+    out("\n")
+
+
 # =========================================================
 # main
 # =========================================================
@@ -256,72 +533,47 @@ def main():
                 target_cfs.append(cf)
 
         # прибираємо дублікати, зберігаючи порядок
-        seen = set()
-        target_cfs = [cf for cf in target_cfs if not (cf in seen or seen.add(cf))]
+        target_cfs = list(dict.fromkeys(target_cfs))
 
         if not target_cfs:
             print("❌ У clients.yml немає жодного валідного LOCATORE_CF")
             return
 
     # -------------------------------------------------
-    # 2) Підключення до БД
+    # 2) Вибірка з БД: пачки CF паралельно, кожна на своєму з'єднанні з пулу
     # -------------------------------------------------
-    conn = get_conn()
-
-    try:
-        # -------------------------------------------------
-        # 3) Основний цикл по CF
-        # -------------------------------------------------
-        for idx, cf in enumerate(target_cfs, start=1):
-            print("=" * 80)
-            print(f"[{idx}] CF: {cf}")
-            print("=" * 80)
-
-            # ---------- PERSON ----------
-            person = fetch_person(conn, cf)
-            if not person:
-                print(f"❌ PERSONS: CF {cf} не знайдено в БД")
-                continue
-
-            print(f"Locatore: {person.get('name')} {person.get('surname')}")
-
-            # ---------- VISURA ----------
-            visura = fetch_visura(conn, cf)
-            if not visura:
-                print("❌ VISURA: відсутня (потрібно запускати спайдер)")
-                continue
+    # Пул створюємо до запуску потоків (лінива ініціалізація не потокобезпечна)
+    get_pool()
 
-            print("\nVISURA:")
-            for k, v in visura.items():
-                print_kv(k, v, 2)
-
-            # ---------- IMMOBILI ----------
-            immobili = fetch_immobili(conn, cf)
-            print(f"\nIMMOBILI: {len(immobili)}")
-
-            if not immobili:
-                print("⚠️ Візура є, але immobili відсутні")
-                continue
-
-            for imm_idx, imm in enumerate(immobili, start=1):
-                print("\n" + "-" * 80)
-                print(f"IMMOBILE [{imm_idx}] id={imm.get('id')}")
-                print("-" * 80)
-
-                # Блок 1 — підказка для clients.yml
-                print_block_1_yaml_hint(cf, imm)
-
-                # Блок 2 — повний дамп з БД
-                contracts = fetch_contracts(conn, imm["id"])
-                print_block_2_full_dump(imm, contracts, conn)
-
-            print("\n")
-
-        print("=" * 80)
-
-    finally:
-        conn.close()
+    batches = [
+        target_cfs[i:i + INSPECT_BATCH_SIZE]
+        for i in range(0, len(target_cfs), INSPECT_BATCH_SIZE)
+    ]
 
+    # -------------------------------------------------
+    # 3) Основний цикл по CF (вивід — строго в порядку target_cfs)
+    # -------------------------------------------------
+    with ThreadPoolExecutor(max_workers=min(len(batches), DB_POOL_MAX_SIZE)) as executor:
+        idx = 0
+        for batch_cfs, data in zip(batches, executor.map(load_inspect_batch, batches)):
+            for cf in batch_cfs:
+                idx += 1
+                try:
+                    print_client(
+                        idx,
+                        cf,
+                        data.tree.get(cf),
+                        data.contracts_by_imm,
+                        data.parties_by_cid,
+                        data.canoni_by_cid,
+                        data.overrides_by_cid,
+                    )
+                finally:
+                    # один запис у stdout на кожен CF
+                    flush_out()
+
+    out("=" * 80)
+    flush_out()
 
 
 if __name__ == "__main__":
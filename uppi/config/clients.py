@@ -60,63 +60,13 @@ class ClientConfig:
         default_tipo_catasto: str,
         default_ufficio_label: str,
     ) -> "ClientConfig":
-        if not isinstance(raw, dict):
-            raise ValueError("Client entry must be a mapping")
-
-        locatore_cf = (raw.get("LOCATORE_CF") or raw.get("locatore_cf") or "").strip()
-        if not locatore_cf:
-            raise ValueError("LOCATORE_CF is required")
-
-        force_update_raw = raw.get("FORCE_UPDATE_VISURA", raw.get("force_update_visura"))
-        force_update = _parse_bool(force_update_raw)
-
-        elements = {k.lower(): v for k, v in raw.items() if str(k).strip().upper() in _ELEMENT_KEYS}
-
         return cls(
-            locatore_cf=locatore_cf,
-            comune=str(raw.get("COMUNE", raw.get("comune", default_comune)) or default_comune),
-            tipo_catasto=str(raw.get("TIPO_CATASTO", raw.get("tipo_catasto", default_tipo_catasto)) or default_tipo_catasto),
-            ufficio_label=str(
-                raw.get(
-                    "UFFICIO_PROVINCIALE_LABEL",
-                    raw.get("ufficio_label", default_ufficio_label),
-                )
-                or default_ufficio_label
-            ),
-            force_update_visura=force_update,
-            locatore_comune_res=_opt_str(raw.get("LOCATORE_COMUNE_RES", raw.get("locatore_comune_res"))),
-            locatore_via=_opt_str(raw.get("LOCATORE_VIA", raw.get("locatore_via"))),
-            locatore_civico=_opt_str(raw.get("LOCATORE_CIVICO", raw.get("locatore_civico"))),
-            immobile_comune=_opt_str(raw.get("IMMOBILE_COMUNE", raw.get("immobile_comune"))),
-            immobile_via=_opt_str(raw.get("IMMOBILE_VIA", raw.get("immobile_via"))),
-            immobile_civico=_opt_str(raw.get("IMMOBILE_CIVICO", raw.get("immobile_civico"))),
-            immobile_piano=_opt_str(raw.get("IMMOBILE_PIANO", raw.get("immobile_piano"))),
-            immobile_interno=_opt_str(raw.get("IMMOBILE_INTERNO", raw.get("immobile_interno"))),
-            foglio=_opt_str(raw.get("FOGLIO", raw.get("foglio"))),
-            numero=_opt_str(raw.get("NUMERO", raw.get("numero"))),
-            sub=_opt_str(raw.get("SUB", raw.get("sub"))),
-            rendita=_opt_str(raw.get("RENDITA", raw.get("rendita"))),
-            superficie_totale=_opt_str(raw.get("SUPERFICIE_TOTALE", raw.get("superficie_totale"))),
-            categoria=_opt_str(raw.get("CATEGORIA", raw.get("categoria"))),
-            contratto_data=_opt_str(raw.get("CONTRATTO_DATA", raw.get("contratto_data"))),
-            conduttore_nome=_opt_str(raw.get("CONDUTTORE_NOME", raw.get("conduttore_nome"))),
-            conduttore_cf=_opt_str(raw.get("CONDUTTORE_CF", raw.get("conduttore_cf"))),
-            conduttore_comune=_opt_str(raw.get("CONDUTTORE_COMUNE", raw.get("conduttore_comune"))),
-            conduttore_via=_opt_str(raw.get("CONDUTTORE_VIA", raw.get("conduttore_via"))),
-            decorrenza_data=_opt_str(raw.get("DECORRENZA_DATA", raw.get("decorrenza_data"))),
-            registrazione_data=_opt_str(raw.get("REGISTRAZIONE_DATA", raw.get("registrazione_data"))),
-            registrazione_num=_opt_str(raw.get("REGISTRAZIONE_NUM", raw.get("registrazione_num"))),
-            agenzia_entrate_sede=_opt_str(raw.get("AGENZIA_ENTRATE_SEDE", raw.get("agenzia_entrate_sede"))),
-            contract_kind=_opt_str(raw.get("CONTRACT_KIND", raw.get("contract_kind"))),
-            arredato=_opt_str(raw.get("ARREDATO", raw.get("arredato"))),
-            energy_class=_opt_str(raw.get("ENERGY_CLASS", raw.get("energy_class"))),
-            canone_contrattuale_mensile=_opt_str(
-                raw.get("CANONE_CONTRATTUALE_MENSILE", raw.get("canone_contrattuale_mensile"))
-            ),
-            durata_anni=_opt_str(raw.get("DURATA_ANNI", raw.get("durata_anni"))),
-            istat = float(raw.get("ISTAT", raw.get("istat"))) if raw.get("ISTAT", raw.get("istat")) is not None else None,
-            elements=elements,
-            extra=_extract_extra(raw),
+            **_fields_from_raw(
+                raw,
+                default_comune=default_comune,
+                default_tipo_catasto=default_tipo_catasto,
+                default_ufficio_label=default_ufficio_label,
+            )
         )
 
     def to_item_dict(self) -> Dict[str, Any]:
@@ -162,6 +112,81 @@ class ClientConfig:
         return base
 
 
+def client_item_from_raw(
+    raw: Dict[str, Any],
+    *,
+    default_comune: str,
+    default_tipo_catasto: str,
+    default_ufficio_label: str,
+) -> Dict[str, Any]:
+    """
+    Те саме, що ClientConfig.from_raw(...).to_item_dict(), але без
+    проміжного frozen-dataclass: один прохід raw -> dict.
+    """
+    item = _fields_from_raw(
+        raw,
+        default_comune=default_comune,
+        default_tipo_catasto=default_tipo_catasto,
+        default_ufficio_label=default_ufficio_label,
+    )
+    elements = item.pop("elements")
+    extra = item.pop("extra")
+    item.update(elements)
+    if extra:
+        item.setdefault("extra", {}).update(extra)
+    return item
+
+
+def _fields_from_raw(
+    raw: Dict[str, Any],
+    *,
+    default_comune: str,
+    default_tipo_catasto: str,
+    default_ufficio_label: str,
+) -> Dict[str, Any]:
+    if not isinstance(raw, dict):
+        raise ValueError("Client entry must be a mapping")
+
+    locatore_cf = (raw.get("LOCATORE_CF") or raw.get("locatore_cf") or "").strip()
+    if not locatore_cf:
+        raise ValueError("LOCATORE_CF is required")
+
+    # Один прохід по ключам raw: кожен ключ класифікуємо одним hash-lookup
+    # у _FIELD_BY_KEY (поле) та _ELEMENT_KEYS/_KNOWN_KEYS (elements/extra).
+    # UPPER-ключ має пріоритет над snake_case, як і раніше з raw.get(UPPER, raw.get(lower)).
+    values: Dict[str, Any] = {}
+    elements: Dict[str, Any] = {}
+    extra: Dict[str, Any] = {}
+    for k, v in raw.items():
+        hit = _FIELD_BY_KEY.get(k)
+        if hit is not None:
+            name, is_upper = hit
+            if is_upper or name not in values:
+                values[name] = v
+        nk = str(k).strip().upper()
+        if nk in _ELEMENT_KEYS:
+            elements[k.lower()] = v
+        elif nk not in _KNOWN_KEYS:
+            extra[k] = v
+
+    fields: Dict[str, Any] = {
+        "locatore_cf": locatore_cf,
+        "comune": str(values.get("comune", default_comune) or default_comune),
+        "tipo_catasto": str(values.get("tipo_catasto", default_tipo_catasto) or default_tipo_catasto),
+        "ufficio_label": str(values.get("ufficio_label", default_ufficio_label) or default_ufficio_label),
+        "force_update_visura": _parse_bool(values.get("force_update_visura")),
+    }
+    for name, _upper in _OPT_STR_FIELDS:
+        fields[name] = _opt_str(values.get(name))
+
+    istat = values.get("istat")
+    fields["istat"] = float(istat) if istat is not None else None
+
+    fields["elements"] = elements
+    fields["extra"] = extra
+    return fields
+
+
 def _opt_str(value: Any) -> str | None:
     if value is None:
         return None
@@ -177,11 +202,6 @@ def _parse_bool(value: Any) -> bool:
     return str(value).strip().lower() in {"1", "true", "yes", "y", "t", "on", "si", "sì"}
 
 
-def _extract_extra(raw: Dict[str, Any]) -> Dict[str, Any]:
-    known = {k.upper() for k in _BASE_KEYS} | _ELEMENT_KEYS
-    return {k: v for k, v in raw.items() if str(k).strip().upper() not in known}
-
-
 _BASE_KEYS = {
     "LOCATORE_CF",
     "COMUNE",
@@ -219,4 +239,55 @@ _BASE_KEYS = {
     "ISTAT",
 }
 
-_ELEMENT_KEYS = {f"{prefix}{num}" for prefix in ["A", "B", "C", "D"] for num in range(1, 14)}
+# Опціональні рядкові поля: (snake_case, UPPER-ключ у YAML)
+_OPT_STR_FIELDS = tuple(
+    (name, name.upper())
+    for name in (
+        "locatore_comune_res",
+        "locatore_via",
+        "locatore_civico",
+        "immobile_comune",
+        "immobile_via",
+        "immobile_civico",
+        "immobile_piano",
+        "immobile_interno",
+        "foglio",
+        "numero",
+        "sub",
+        "rendita",
+        "superficie_totale",
+        "categoria",
+        "contratto_data",
+        "conduttore_nome",
+        "conduttore_cf",
+        "conduttore_comune",
+        "conduttore_via",
+        "decorrenza_data",
+        "registrazione_data",
+        "registrazione_num",
+        "agenzia_entrate_sede",
+        "contract_kind",
+        "arredato",
+        "energy_class",
+        "canone_contrattuale_mensile",
+        "durata_anni",
+    )
+)
+
+# YAML-ключ -> (поле, чи це UPPER-варіант)
+_FIELD_BY_KEY: Dict[str, tuple[str, bool]] = {}
+for _name, _upper in (
+    *_OPT_STR_FIELDS,
+    ("comune", "COMUNE"),
+    ("tipo_catasto", "TIPO_CATASTO"),
+    ("ufficio_label", "UFFICIO_PROVINCIALE_LABEL"),
+    ("force_update_visura", "FORCE_UPDATE_VISURA"),
+    ("istat", "ISTAT"),
+):
+    _FIELD_BY_KEY[_name] = (_name, False)
+    _FIELD_BY_KEY[_upper] = (_name, True)
+del _name, _upper
+
+_ELEMENT_KEYS = frozenset(f"{prefix}{num}" for prefix in ["A", "B", "C", "D"] for num in range(1, 14))
+
+_KNOWN_KEYS = frozenset(_BASE_KEYS) | _ELEMENT_KEYS
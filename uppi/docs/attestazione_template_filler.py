@@ -1,4 +1,4 @@
-import shutil
+import io
 import re
 from pathlib import Path
 
@@ -11,6 +11,22 @@ SPACE_TO_UNDERSCORE_RATIO = 1.8
 # Регулярка для пошуку всіх плейсхолдерів типу {{KEY}}
 PLACEHOLDER_RE = re.compile(r"{{[^}]+}}")
 
+# Сирі байти шаблонів: path → (mtime_ns, bytes). Шаблон читається з диска один раз
+# на батч; при зміні файлу (mtime) перечитується.
+_TEMPLATE_CACHE: dict[str, tuple[int, bytes]] = {}
+
+
+def _load_template_bytes(template_path) -> bytes:
+    path = Path(template_path)
+    key = str(path)
+    mtime_ns = path.stat().st_mtime_ns
+
+    cached = _TEMPLATE_CACHE.get(key)
+    if cached is None or cached[0] != mtime_ns:
+        cached = (mtime_ns, path.read_bytes())
+        _TEMPLATE_CACHE[key] = cached
+    return cached[1]
+
 
 def fill_underscored(text: str | None, length: int) -> str:
     """
@@ -44,70 +60,113 @@ def fill_underscored(text: str | None, length: int) -> str:
     return " " * left_padding + text + " " * right_padding
 
 
-def _replace_in_run(run, params: dict, underscored: dict):
+# Заміна для плейсхолдера, якого немає ні в params, ні в underscored
+_EMPTY_REPLACEMENT = ("", False)
+
+
+def build_replacements(params: dict, underscored: dict) -> dict:
     """
-    Обробляє ОДИН run:
-
-    - знаходить усі {{KEY}} у run.text;
-    - для кожного KEY:
-        * якщо KEY == {{CONDUTTORE_CF}}:
-              спеціальна логіка — просто вставляємо значення,
-              щоб не ламати верстку, underline лишається з шаблону.
-        * якщо KEY у params:
-              - якщо KEY у underscored → fill_underscored(value, length)
-              - інакше → str(value або "")
-        * якщо KEY НЕ у params:
-              - якщо KEY у underscored → "порожній бланк": "_" * length
-              - інакше → "" (прибрати повністю).
-    - якщо хоч один KEY був з underscored → ставимо underline на run.
+    Обчислює заміну для кожного відомого KEY один раз на документ:
+    KEY → (текст заміни, чи потрібен underline).
+
+    - {{CONDUTTORE_CF}}:
+          спеціальна логіка — просто вставляємо значення,
+          щоб не ламати верстку, underline лишається з шаблону.
+    - KEY у params:
+          - якщо KEY у underscored → fill_underscored(value, length)
+          - інакше → str(value або "")
+    - KEY НЕ у params:
+          - якщо KEY у underscored → "порожній бланк": "_" * length
+          - інакше → "" (прибрати повністю).
     """
-    text = run.text
-    if "{{" not in text:
-        return  # нічого робити
+    replacements = {}
+    for key in params.keys() | underscored.keys():
+        # Значення з params (може бути None / "")
+        value = params.get(key, None)
 
+        # --- СПЕЦІАЛЬНИЙ ВИПАДОК ДЛЯ {{CONDUTTORE_CF}} ---
+        if key == "{{CONDUTTORE_CF}}":
+            length = underscored.get(key, 0)
+            # якщо є значення → просто вставляємо текст,
+            # якщо немає → малюємо рівно length підкреслень
+            replacements[key] = (str(value) if value else "_" * max(length, 0), True)
+        # Плейсхолдер з фіксованою довжиною підкреслень
+        elif key in underscored:
+            replacements[key] = (fill_underscored(value, underscored[key]), True)
+        # Звичайний плейсхолдер, без підкреслень
+        elif value is not None:
+            replacements[key] = (str(value), False)
+        else:
+            replacements[key] = _EMPTY_REPLACEMENT
+    return replacements
+
+
+def _substitute(text: str, replacements: dict) -> tuple:
+    """
+    Замінює всі {{KEY}} у тексті готовими значеннями з replacements
+    (невідомі ключі прибираються).
+
+    Повертає (новий текст, чи потрібен underline).
+    """
     underline_needed = False
 
     def repl(match: re.Match) -> str:
         nonlocal underline_needed
-        key = match.group(0)  # включно з {{ }}
+        new, underline = replacements.get(match.group(0), _EMPTY_REPLACEMENT)
+        underline_needed = underline_needed or underline
+        return new
 
-        # Значення з params (може бути None / "")
-        value = params.get(key, None)
+    return PLACEHOLDER_RE.sub(repl, text), underline_needed
 
-        # --- СПЕЦІАЛЬНИЙ ВИПАДОК ДЛЯ {{CONDUTTORE_CF}} ---
-        if key == "{{CONDUTTORE_CF}}":
-            underline_needed = True
-            length = underscored.get(key, 0)
-            # якщо є значення → просто вставляємо текст
-            if value:
-                return str(value)
-            # якщо немає значення → малюємо рівно length підкреслень
-            return "_" * max(length, 0)
 
-        # Плейсхолдер з фіксованою довжиною підкреслень
-        if key in underscored:
-            underline_needed = True
-            length = underscored[key]
-            return fill_underscored(value, length)
+def _replace_in_run(run, replacements: dict, cache: dict | None = None):
+    """
+    Обробляє ОДИН run: кожен {{KEY}} замінюється готовим значенням з replacements.
+    Якщо хоч один KEY був з underscored → ставимо underline на run.
 
-        # Звичайний плейсхолдер, без підкреслень
-        if value is not None:
-            return str(value)
+    cache — результати _substitute за текстом run-а: однакові run-и
+    (колонтитули, повторювані блоки таблиць) обробляються regex-ом один раз.
+    """
+    text = run.text
+    if "{{" not in text:
+        return  # нічого робити
 
-        # Немає в params і не underscored → прибираємо ключ
-        return ""
+    result = cache.get(text) if cache is not None else None
+    if result is None:
+        result = _substitute(text, replacements)
+        if cache is not None:
+            cache[text] = result
 
-    new_text = PLACEHOLDER_RE.sub(repl, text)
+    new_text, underline_needed = result
     if new_text != text:
         run.text = new_text
         if underline_needed:
             run.font.underline = WD_UNDERLINE.SINGLE
 
 
+def iter_paragraphs(container):
+    """
+    Усі параграфи документа або комірки: спершу власні, потім з таблиць,
+    включно з вкладеними таблицями в комірках.
+    """
+    yield from container.paragraphs
+    for table in container.tables:
+        for row in table.rows:
+            for cell in row.cells:
+                yield from iter_paragraphs(cell)
+
+
+def iter_runs(doc):
+    """Усі run-и документа (параграфи + таблиці, з вкладеними)."""
+    for paragraph in iter_paragraphs(doc):
+        yield from paragraph.runs
+
+
 def replace_in_paragraph(paragraph, params: dict, underscored: dict):
     """Обробляє всі run-и в параграфі."""
+    replacements = build_replacements(params, underscored)
     for run in paragraph.runs:
-        _replace_in_run(run, params, underscored)
+        _replace_in_run(run, replacements)
 
 
 def replace_in_cell(cell, params: dict, underscored: dict):
@@ -126,32 +185,30 @@ def fill_attestazione_template(
     """
     Основна функція:
 
-    - робить копію шаблону в output_folder/filename;
+    - відкриває шаблон з кешу в пам'яті (див. _load_template_bytes);
     - проганяє всі параграфи та таблиці, замінюючи {{KEY}} згідно params/underscored;
-    - повертає шлях до заповненого файлу.
+    - зберігає результат в output_folder/filename і повертає шлях до нього.
     """
     output_folder = Path(output_folder)
     output_folder.mkdir(parents=True, exist_ok=True)
 
     out_path = output_folder / filename
 
-    # 1. копія шаблону
-    shutil.copy(template_path, out_path)
-
-    # 2. завантажуємо документ
-    doc = Document(out_path)
+    # 1-2. документ з кешованих байтів шаблону (без копії файлу на диску)
+    doc = Document(io.BytesIO(_load_template_bytes(template_path)))
 
-    # 3. параграфи
-    for paragraph in doc.paragraphs:
-        replace_in_paragraph(paragraph, params, underscored)
+    # 3. заздалегідь відбираємо лише run-и з {{ — далі працюємо тільки з ними
+    target_runs = [run for run in iter_runs(doc) if "{{" in run.text]
 
-    # 4. таблиці
-    for table in doc.tables:
-        for row in table.rows:
-            for cell in row.cells:
-                replace_in_cell(cell, params, underscored)
+    # 4-5. заміни рахуємо один раз на документ (якщо є що міняти);
+    #      результат кешується за текстом run-а
+    if target_runs:
+        replacements = build_replacements(params, underscored)
+        substituted: dict = {}
+        for run in target_runs:
+            _replace_in_run(run, replacements, substituted)
 
-    # 5. зберігаємо
+    # 6. зберігаємо
     doc.save(out_path)
     return str(out_path)
 
@@ -1,33 +1,75 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Tuple
+import copy
 import logging
+import sys
 
 import yaml
 
-from uppi.config.clients import ClientConfig
+from uppi.config.clients import client_item_from_raw
 
 logger = logging.getLogger(__name__)
 
 CLIENTS_DIR = Path(__file__).resolve().parents[2] / "clients"
 CLIENTS_FILE = CLIENTS_DIR / "clients.yml"
 
-DEFAULT_COMUNE = "PESCARA"
-DEFAULT_TIPO_CATASTO = "F"
-DEFAULT_UFFICIO = "PESCARA Territorio"
+DEFAULT_COMUNE = sys.intern("PESCARA")
+DEFAULT_TIPO_CATASTO = sys.intern("F")
+DEFAULT_UFFICIO = sys.intern("PESCARA Territorio")
 
+# Поля з малою кардинальністю: значення повторюються між клієнтами,
+# тож інтернуємо їх — менше дублікатів у пам'яті й порівняння по вказівнику
+_INTERNED_FIELDS = (
+    "comune",
+    "tipo_catasto",
+    "ufficio_label",
+    "locatore_comune_res",
+    "immobile_comune",
+    "conduttore_comune",
+    "categoria",
+    "contract_kind",
+    "arredato",
+    "energy_class",
+)
 
-def _parse_yaml(path: Path) -> List[Dict[str, Any]]:
-    clients: List[Dict[str, Any]] = []
+# libyaml-лоадер у 10-20 разів швидший за чисто-Python SafeLoader; fallback, якщо PyYAML зібрано без libyaml
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+# path -> (mtime_ns, size, розпарсений список клієнтів)
+_CLIENTS_CACHE: Dict[str, Tuple[int, int, List[Dict[str, Any]]]] = {}
 
-    if not path.exists():
+
+def _parse_yaml(path: Path) -> List[Dict[str, Any]]:
+    # EAFP: один stat() і для перевірки існування, і для ключа кешу
+    try:
+        st = path.stat()
+    except FileNotFoundError:
         logger.error("[CLIENTS] Файл clients.yml не знайдено: %s", path)
-        return clients
+        return []
+    except OSError as e:
+        logger.exception("[CLIENTS] Неможливо прочитати %s: %s", path, e)
+        return []
+
+    key = str(path)
+    cached = _CLIENTS_CACHE.get(key)
+    if cached is not None and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+        # deepcopy, щоб виклики могли безпечно змінювати результат
+        return copy.deepcopy(cached[2])
+
+    clients = _parse_yaml_uncached(path)
+    _CLIENTS_CACHE[key] = (st.st_mtime_ns, st.st_size, clients)
+    return copy.deepcopy(clients)
+
+
+def _parse_yaml_uncached(path: Path) -> List[Dict[str, Any]]:
+    clients: List[Dict[str, Any]] = []
 
     try:
-        with path.open("r", encoding="utf-8") as f:
-            data = yaml.safe_load(f) or []
+        # libyaml сам декодує UTF-8 у C — без Python-декодера текстового потоку
+        with path.open("rb") as f:
+            data = yaml.load(f, Loader=_YAML_LOADER) or []
     except Exception as e:
         logger.exception("[CLIENTS] Неможливо прочитати %s: %s", path, e)
         return clients
@@ -36,9 +78,19 @@ def _parse_yaml(path: Path) -> List[Dict[str, Any]]:
         logger.error("[CLIENTS] Очікував список у %s, а отримав %r", path, type(data))
         return clients
 
-    for raw in data:
+    clients = _process_rows(data)
+
+    logger.info("[CLIENTS] Завантажено %d клієнтів із %s", len(clients), path)
+    return clients
+
+
+def _process_rows(rows: List[Any]) -> List[Dict[str, Any]]:
+    """Сирі YAML-записи -> item-словники."""
+    clients: List[Dict[str, Any]] = []
+
+    for raw in rows:
         try:
-            client_cfg = ClientConfig.from_raw(
+            client_dict = client_item_from_raw(
                 raw,
                 default_comune=DEFAULT_COMUNE,
                 default_tipo_catasto=DEFAULT_TIPO_CATASTO,
@@ -51,25 +103,28 @@ def _parse_yaml(path: Path) -> List[Dict[str, Any]]:
             logger.exception("[CLIENTS] Неочікувана помилка при читанні YAML: %s", e)
             continue
 
-        client_dict = client_cfg.to_item_dict()
+        for field in _INTERNED_FIELDS:
+            value = client_dict.get(field)
+            if type(value) is str and len(value) < 32:
+                client_dict[field] = sys.intern(value)
 
-        client_dict.update(client_cfg.extra)
+        aliases = {
+            "LOCATORE_CF": client_dict["locatore_cf"],
+            "COMUNE": client_dict["comune"],
+            "TIPO_CATASTO": client_dict["tipo_catasto"],
+            "UFFICIO_PROVINCIALE_LABEL": client_dict["ufficio_label"],
+            "FORCE_UPDATE_VISURA": client_dict["force_update_visura"],
+        }
 
-        client_dict["LOCATORE_CF"] = client_cfg.locatore_cf
-        client_dict["COMUNE"] = client_cfg.comune
-        client_dict["TIPO_CATASTO"] = client_cfg.tipo_catasto
-        client_dict["UFFICIO_PROVINCIALE_LABEL"] = client_cfg.ufficio_label
-        client_dict["FORCE_UPDATE_VISURA"] = bool(client_cfg.force_update_visura)
+        # extra не може перезаписати snake_case-поля: _fields_from_raw відкидає відомі ключі
+        extra = client_dict.get("extra")
+        if extra:
+            client_dict.update(extra)
 
-        client_dict["locatore_cf"] = client_cfg.locatore_cf
-        client_dict["comune"] = client_cfg.comune
-        client_dict["tipo_catasto"] = client_cfg.tipo_catasto
-        client_dict["ufficio_label"] = client_cfg.ufficio_label
-        client_dict["force_update_visura"] = bool(client_cfg.force_update_visura)
+        client_dict.update(aliases)
 
         clients.append(client_dict)
 
-    logger.info("[CLIENTS] Завантажено %d клієнтів із %s", len(clients), path)
     return clients
 
 
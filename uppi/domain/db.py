@@ -1,9 +1,14 @@
 # uppi/domain/db.py
 from __future__ import annotations
 
+import atexit
 import logging
+import threading
+from contextlib import contextmanager
+from typing import Iterator, Optional
 
 import psycopg2
+import psycopg2.pool
 from decouple import config
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type, before_sleep_log
 from psycopg2 import OperationalError, InterfaceError
@@ -17,6 +22,19 @@ DB_NAME = config("DB_NAME", default="uppi_db")
 DB_USER = config("DB_USER", default="uppi_user")
 DB_PASSWORD = config("DB_PASSWORD", default="uppi_password")
 DB_SSL_MODE = config("DB_SSL_MODE", default="prefer")
+DB_POOL_MIN_SIZE = config("DB_POOL_MIN_SIZE", default=0, cast=int)
+DB_POOL_MAX_SIZE = config("DB_POOL_MAX_SIZE", default=8, cast=int)
+# Страховка від завислих запитів (мс, 0 = вимкнено). Передається як startup-параметр
+# конекту, тож не коштує окремого `SET statement_timeout` round-trip'у на кожен запит.
+DB_STATEMENT_TIMEOUT_MS = config("DB_STATEMENT_TIMEOUT_MS", default=0, cast=int)
+_CONNECT_OPTIONS = (
+    {"options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"}
+    if DB_STATEMENT_TIMEOUT_MS > 0
+    else {}
+)
+
+_POOL: Optional[psycopg2.pool.ThreadedConnectionPool] = None
+_POOL_LOCK = threading.Lock()
 
 
 @retry(
@@ -45,6 +63,7 @@ def get_pg_connection():
             user=DB_USER,
             password=DB_PASSWORD,
             sslmode=DB_SSL_MODE,
+            **_CONNECT_OPTIONS,
         )
         conn.autocommit = False
         return conn
@@ -53,27 +72,85 @@ def get_pg_connection():
         raise
 
 
+def get_pg_pool() -> psycopg2.pool.ThreadedConnectionPool:
+    """
+    Лінивий потокобезпечний пул конекшнів до PostgreSQL.
+
+    Створюється при першому зверненні, тож імпорт модуля не ходить у БД;
+    далі тримає DB_POOL_MIN_SIZE..DB_POOL_MAX_SIZE конектів.
+    Пул закривається через atexit.
+    """
+    global _POOL
+    if _POOL is None:
+        with _POOL_LOCK:
+            if _POOL is None:
+                _POOL = psycopg2.pool.ThreadedConnectionPool(
+                    DB_POOL_MIN_SIZE,
+                    DB_POOL_MAX_SIZE,
+                    host=DB_HOST,
+                    port=DB_PORT,
+                    dbname=DB_NAME,
+                    user=DB_USER,
+                    password=DB_PASSWORD,
+                    sslmode=DB_SSL_MODE,
+                    **_CONNECT_OPTIONS,
+                )
+                atexit.register(_POOL.closeall)
+    return _POOL
+
+
+@retry(
+    stop=stop_after_attempt(3),
+    wait=wait_exponential(multiplier=1, min=1, max=20),
+    retry=retry_if_exception_type((OperationalError, InterfaceError)),
+    before_sleep=before_sleep_log(logger, logging.WARNING),
+    reraise=True,
+)
+def get_pooled_connection():
+    """
+    Взяти конекшн із пулу (autocommit = False). Повертати через
+    release_pooled_connection() у finally. Retry — як у get_pg_connection().
+    """
+    return get_pg_pool().getconn()
+
+
+def release_pooled_connection(conn) -> None:
+    """Повернути конекшн у пул; зламані конекти закриваються, а не перевикористовуються."""
+    if not conn.closed and conn.autocommit:
+        conn.autocommit = False
+    get_pg_pool().putconn(conn, close=bool(conn.closed))
+
+
+@contextmanager
+def pooled_connection(autocommit: bool = False) -> Iterator["psycopg2.extensions.connection"]:
+    """
+    Позичити конекшн із пулу замість повного handshake на кожен виклик.
+    Незавершена транзакція відкочується пулом при поверненні конекту.
+
+    autocommit=True — для read-only запитів: без BEGIN/COMMIT round-trip'ів.
+    """
+    conn = get_pooled_connection()
+    try:
+        conn.autocommit = autocommit
+        yield conn
+    finally:
+        release_pooled_connection(conn)
+
+
 def db_has_visura(cf: str) -> bool:
     """
     Повертає True, якщо візура для заданого CF існує в таблиці visure.
     """
-    conn = None
     try:
-        conn = get_pg_connection()
-        with conn.cursor() as cur:
-            cur.execute("SELECT 1 FROM public.visure WHERE cf = %s LIMIT 1;", (cf,))
-            exists = cur.fetchone() is not None
+        with pooled_connection(autocommit=True) as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "SELECT EXISTS(SELECT 1 FROM public.visure WHERE locatore_cf = %s);",
+                    (cf,),
+                )
+                exists = bool(cur.fetchone()[0])
             logger.debug("[DB] db_has_visura(%s) → %s", cf, exists)
-            conn.commit()
             return exists
     except psycopg2.Error as e:
         logger.exception("[DB] Помилка при перевірці visura для %s: %s", cf, e)
-        if conn is not None:
-            try:
-                conn.rollback()
-            except Exception:
-                pass
         return False
-    finally:
-        if conn is not None:
-            conn.close()
@@ -2,6 +2,7 @@
 from __future__ import annotations
 
 import logging
+import threading
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Optional
@@ -12,6 +13,11 @@ from minio.error import S3Error
 
 logger = logging.getLogger(__name__)
 
+# Візури/атестації — до кількох МБ: з part_size 10 MiB вони йдуть одним PUT,
+# без multipart-переговорів; більші файли вантажаться частинами паралельно
+UPLOAD_PART_SIZE = 10 * 1024 * 1024
+UPLOAD_PARALLEL_PARTS = 4
+
 
 @dataclass(frozen=True)
 class ObjectStorageConfig:
@@ -50,40 +56,57 @@ class ObjectStorage:
     def __init__(self, cfg: Optional[ObjectStorageConfig] = None):
         self.cfg = cfg or load_storage_config()
         self._client: Optional[Minio] = None
+        # Upload-и йдуть із кількох потоків: ініціалізація клієнта й перевірка
+        # bucket'ів під lock, і bucket перевіряємо один раз на процес
+        self._lock = threading.Lock()
+        self._ensured_buckets: set[str] = set()
 
     @property
     def client(self) -> Minio:
         if self._client is None:
-            self._client = Minio(
-                self.cfg.endpoint,
-                access_key=self.cfg.access_key,
-                secret_key=self.cfg.secret_key,
-                secure=self.cfg.secure,
-            )
+            with self._lock:
+                if self._client is None:
+                    self._client = Minio(
+                        self.cfg.endpoint,
+                        access_key=self.cfg.access_key,
+                        secret_key=self.cfg.secret_key,
+                        secure=self.cfg.secure,
+                    )
         return self._client
 
     def ensure_bucket(self, bucket: str) -> None:
         """
         Для MinIO локально — створить bucket якщо нема.
         Для R2 часто створення bucket API може бути заборонене — тоді просто лог і йдемо далі.
+        Успішна перевірка запам'ятовується: HEAD bucket не шлемо на кожен upload.
         """
-        try:
-            exists = self.client.bucket_exists(bucket)
-        except Exception as e:
-            logger.warning("[S3] Cannot check bucket_exists(%s): %s", bucket, e)
-            return
-
-        if exists:
+        if bucket in self._ensured_buckets:
             return
 
-        try:
-            self.client.make_bucket(bucket)
-            logger.info("[S3] Created bucket=%s", bucket)
-        except S3Error as e:
-            # На R2 типово: AccessDenied або MethodNotAllowed
-            logger.warning("[S3] Cannot make_bucket(%s): %s", bucket, e)
-        except Exception as e:
-            logger.warning("[S3] Unexpected make_bucket(%s) error: %s", bucket, e)
+        client = self.client
+        with self._lock:
+            if bucket in self._ensured_buckets:
+                return
+
+            try:
+                exists = client.bucket_exists(bucket)
+            except Exception as e:
+                logger.warning("[S3] Cannot check bucket_exists(%s): %s", bucket, e)
+                return
+
+            if not exists:
+                try:
+                    client.make_bucket(bucket)
+                    logger.info("[S3] Created bucket=%s", bucket)
+                except S3Error as e:
+                    # На R2 типово: AccessDenied або MethodNotAllowed
+                    logger.warning("[S3] Cannot make_bucket(%s): %s", bucket, e)
+                    return
+                except Exception as e:
+                    logger.warning("[S3] Unexpected make_bucket(%s) error: %s", bucket, e)
+                    return
+
+            self._ensured_buckets.add(bucket)
 
     def object_exists(self, bucket: str, object_name: str) -> bool:
         try:
@@ -102,7 +125,14 @@ class ObjectStorage:
         self.ensure_bucket(bucket)
 
         try:
-            self.client.fput_object(bucket, object_name, str(file_path), content_type=content_type)
+            self.client.fput_object(
+                bucket,
+                object_name,
+                str(file_path),
+                content_type=content_type,
+                part_size=UPLOAD_PART_SIZE,
+                num_parallel_uploads=UPLOAD_PARALLEL_PARTS,
+            )
             logger.info("[S3] Uploaded %s -> %s/%s", file_path, bucket, object_name)
         except S3Error as e:
             logger.exception("[S3] Upload failed %s -> %s/%s: %s", file_path, bucket, object_name, e)
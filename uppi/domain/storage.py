@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+from functools import lru_cache
 from pathlib import Path
 import logging
 
@@ -11,45 +12,80 @@ logger = logging.getLogger(__name__)
 
 DOWNLOADS_DIR = Path(__file__).resolve().parents[2] / "downloads"
 
+# CF, чиї каталоги вже створені в цьому процесі
+_ENSURED_DIRS: set[str] = set()
+
 
 def slugify_immobile(imm: Immobile) -> str:
     """
     Створює стабільний slug для Immobile на основі кадастрових атрибутів.
     """
+    # Immobile — мутабельний dataclass (не hashable), тож кешуємо по кортежу атрибутів
+    slug = _slug_from_parts(
+        imm.foglio,
+        imm.numero,
+        imm.sub,
+        imm.zona_cens,
+        imm.micro_zona,
+        imm.categoria,
+        imm.classe,
+        imm.consistenza,
+    )
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("[STORAGE] slugify_immobile → %s", slug)
+    return slug
+
+
+@lru_cache(maxsize=1024)
+def _slug_from_parts(foglio, numero, sub, zona_cens, micro_zona, categoria, classe, consistenza) -> str:
     parts = []
 
-    if imm.foglio:
-        parts.append(f"F{imm.foglio}")
-    if imm.numero:
-        parts.append(f"N{imm.numero}")
-    if imm.sub:
-        parts.append(f"S{imm.sub}")
-    if imm.zona_cens:
-        parts.append(f"Z{imm.zona_cens}")
-    if imm.micro_zona:
-        parts.append(f"MZ{imm.micro_zona}")
-    if imm.categoria:
-        parts.append(f"CAT{imm.categoria.replace('/', '')}")
-    if imm.classe:
-        parts.append(f"CL{imm.classe}")
-    if imm.consistenza:
-        parts.append(f"CONS{imm.consistenza}")
-
-    slug = "_".join(parts) if parts else "IMMOBILE"
-    logger.debug("[STORAGE] slugify_immobile → %s", slug)
-    return slug
+    if foglio:
+        parts.append(f"F{foglio}")
+    if numero:
+        parts.append(f"N{numero}")
+    if sub:
+        parts.append(f"S{sub}")
+    if zona_cens:
+        parts.append(f"Z{zona_cens}")
+    if micro_zona:
+        parts.append(f"MZ{micro_zona}")
+    if categoria:
+        parts.append(f"CAT{categoria.replace('/', '')}")
+    if classe:
+        parts.append(f"CL{classe}")
+    if consistenza:
+        parts.append(f"CONS{consistenza}")
+
+    return "_".join(parts) if parts else "IMMOBILE"
+
+
+@lru_cache(maxsize=4096)
+def client_dir_path(cf: str) -> Path:
+    """
+    Шлях до каталогу клієнта без звернення до файлової системи.
+    Path незмінний, тож кешуємо його per CF замість нового `/` на кожен виклик.
+    """
+    return DOWNLOADS_DIR / cf
 
 
 def get_client_dir(cf: str) -> Path:
     """Повертає шлях до каталогу для заданого CF та створює його за потреби."""
-    client_dir = DOWNLOADS_DIR / cf
-    client_dir.mkdir(parents=True, exist_ok=True)
-    logger.debug("[STORAGE] get_client_dir(%s) → %s", cf, client_dir)
+    client_dir = client_dir_path(cf)
+    # mkdir робимо один раз на CF за процес, а не на кожен виклик
+    if cf not in _ENSURED_DIRS:
+        client_dir.mkdir(parents=True, exist_ok=True)
+        _ENSURED_DIRS.add(cf)
+        logger.debug("[STORAGE] get_client_dir(%s) → %s", cf, client_dir)
     return client_dir
 
 
+@lru_cache(maxsize=4096)
 def get_visura_path(cf: str) -> Path:
-    """Шлях до файлу VISURA_<cf>.pdf у каталозі клієнта."""
+    """
+    Шлях до файлу VISURA_<cf>.pdf у каталозі клієнта.
+    Мемоізовано: при повторних викликах (ретраї, батчі) шлях і каталог не перебудовуються.
+    """
     path = get_client_dir(cf) / f"VISURA_{cf}.pdf"
     logger.debug("[STORAGE] get_visura_path(%s) → %s", cf, path)
     return path
@@ -59,9 +95,11 @@ def get_attestazione_path(cf: str, contract_id: str, imm: Immobile) -> Path:
     """
     Шлях до файлу ATTESTAZIONE_<cf>_<contract_id>_<slug>.docx у каталозі клієнта.
     contract_id додаємо, щоб уникнути колізій (1 immobile -> N contracts).
+    Каталог не створюється — це робить той, хто пише файл.
     """
     slug = slugify_immobile(imm)
     safe_contract_id = str(contract_id).replace("/", "_")
-    path = get_client_dir(cf) / f"ATTESTAZIONE_{cf}_{safe_contract_id}_{slug}.docx"
-    logger.debug("[STORAGE] get_attestazione_path(%s, %s, ...) → %s", cf, contract_id, path)
+    path = client_dir_path(cf) / f"ATTESTAZIONE_{cf}_{safe_contract_id}_{slug}.docx"
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("[STORAGE] get_attestazione_path(%s, %s, ...) → %s", cf, contract_id, path)
     return path
@@ -1,4 +1,4 @@
-from uppi.parsers.address_parser import AddressParts, parse_address
+from uppi.parsers.address_parser import AddressParts, parse_address, scan_many
 from uppi.parsers.visura_pdf_parser import VisuraParser
 
-__all__ = ["AddressParts", "parse_address", "VisuraParser"]
+__all__ = ["AddressParts", "parse_address", "scan_many", "VisuraParser"]
@@ -2,14 +2,15 @@ from __future__ import annotations
 
 import re
 from dataclasses import dataclass
-from typing import Dict, Optional
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional
 
 
 # ----------------------------
 # Data model
 # ----------------------------
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class AddressParts:
     """
     Нормалізоване представлення адреси.
@@ -41,11 +42,12 @@ class AddressParts:
 # Street types
 # ----------------------------
 
-_STREET_TYPES = {
+_STREET_TYPES = (
     "VIA",
     "VIALE",
     "PIAZZA",
     "PZZA",
+    "P.ZZA",
     "CORSO",
     "STRADA",
     "VICOLO",
@@ -57,19 +59,32 @@ _STREET_TYPES = {
     "FRAZIONE",
     "FRAZ",
     "CONTRADA",
-}
+)
+
+# Скорочення, після яких може стояти крапка: "LOC.", "FRAZ."
+_STREET_ABBREVIATIONS = {"LOC", "FRAZ"}
+
+
+def _street_type_alternation(types: tuple) -> str:
+    """
+    Будує alternation для типів вулиць.
+
+    Найдовші варіанти йдуть першими (VIALE раніше за VIA),
+    щоб regex не пробував коротший префікс і не відкочувався.
+    """
+    parts = []
+    for street_type in sorted(types, key=len, reverse=True):
+        part = re.escape(street_type)
+        if street_type in _STREET_ABBREVIATIONS:
+            part += r"\.?"
+        parts.append(part)
+    return "|".join(parts)
+
 
 # Тип вулиці завжди на початку рядка
 _STREET_TYPE_REGEX = re.compile(
-    r"""
-    ^
-    (VIA|VIALE|PIAZZA|P\.?ZZA|CORSO|STRADA|VICOLO|LARGO|BORGO|
-     LOCALITÀ|LOC\.?|LOCALITA|FRAZIONE|FRAZ\.?|CONTRADA)
-    \s+
-    (.+)
-    $
-    """,
-    re.IGNORECASE | re.UNICODE | re.VERBOSE,
+    rf"^({_street_type_alternation(_STREET_TYPES)})\s+(.+)$",
+    re.IGNORECASE | re.UNICODE,
 )
 
 
@@ -107,16 +122,74 @@ _CIVICO_REGEXES = [
 # SNC = senza numero civico → номер відсутній
 _SNC_REGEX = re.compile(r"\b(N\.?\s*)?SNC\b", re.IGNORECASE)
 
+# Подвійні пробіли, що лишаються після вирізання компонентів
+_MULTISPACE_REGEX = re.compile(r"\s{2,}")
+
+
+# ----------------------------
+# Canonical address (fast path)
+# ----------------------------
+
+# Канонічний формат SISTER: "VIALE X n. 285 Scala U Interno 1 Piano 1".
+# Ключові слова в атомарних групах (?>...): як і загальний парсер, fast path не
+# відкочується з "SCALA" на "SC" (інакше "Scala Piano 1" дало б scala="ALA").
+# Один анкерований прохід з іменованими групами замість пошуку кожного
+# компонента окремо; все, що не вкладається в цей формат, іде в загальний парсер.
+# Fast path зобов'язаний давати рівно той самий результат, що й загальний
+# парсер (див. _canonical_is_safe), — інакше рядки immobili/addresses
+# залежали б від того, чи є в адресі "n.".
+_ADDRESS_REGEX = re.compile(
+    rf"""
+    (?P<via_type>{_street_type_alternation(_STREET_TYPES)})\s+
+    (?P<via_name>.+?)
+    (?:
+        \s+(?:N\.?\s*)?(?P<snc>SNC)
+      | \s+(?>N\.?|NUM\.?|CIVICO)\s*(?P<via_num>\d+[A-Z]?[-/\dA-Z]*)
+    )
+    (?:\s+(?>SCALA|SC\.?)\s*(?P<scala>[A-Z0-9]+))?
+    (?:\s+(?>INTERNO|INT\.?)\s*(?P<interno>[A-Z0-9]+))?
+    (?:\s+(?>PIANO|P\.)\s*(?P<piano>T|TERRA|RIALZATO|AMMEZZATO|S\d|[-A-Z0-9°]+))?
+    """,
+    re.IGNORECASE | re.UNICODE | re.VERBOSE,
+)
+
+# Загальний парсер шукає SCALA/SC, INTERNO/INT, PIANO/P., SNC і номер по всьому
+# хвосту, тож такий токен усередині назви чи значення (VIA PIANO ALTO, VIA SCARLATTI,
+# Interno SC1) він трактує інакше, ніж fast path. Такі адреси віддаємо загальному
+# парсеру (перевірка навмисно консервативна: достатньо префікса токена).
+_CANONICAL_UNSAFE_REGEX = re.compile(
+    r"\b(?:SC|INT|PIANO|P\.|SNC|NUM|CIVICO|N\.?\s*(?:\d|SNC))",
+    re.IGNORECASE | re.UNICODE,
+)
+
+# Значення, що закінчується не словесним символом ("1°", "10-"), загальний
+# парсер обрізає по \b (а "°" лишає в назві), тож fast path його не бере.
+# Для piano "T°9" загальний парсер зупиняється вже на "T", тому там "-/°"
+# не допускаються взагалі.
+_NON_WORD_TAIL = frozenset("-/°")
+
+# "... N SNC": загальний SNC-regex забирає "N"/"N." з кінця назви разом із SNC
+_TRAILING_N_REGEX = re.compile(r"\bN\.?$", re.IGNORECASE)
+
 
 # ----------------------------
 # Parser
 # ----------------------------
 
+def _normalize_street_type(value: str) -> str:
+    return value.upper().replace(".", "").replace("PZZA", "PIAZZA")
+
+
+@lru_cache(maxsize=10_000)
 def parse_address(text: str) -> AddressParts:
     """
     Парсить італійську адресу у структурований вигляд.
 
+    Результат кешується: AddressParts frozen, а у візурах ті самі
+    адреси повторюються для багатьох immobili.
+
     Стратегія:
+    0) Канонічний формат SISTER розбирається одним fullmatch
     1) Нормалізація тексту
     2) Визначення via_type + via_name (основа)
     3) Робота ТІЛЬКИ з хвостом (via_name)
@@ -129,7 +202,53 @@ def parse_address(text: str) -> AddressParts:
         raise TypeError("parse_address expects a string")
 
     raw = text.replace("\n", " ").strip()
-    working = raw
+    # Один прохід split/join у C замість regex: колапсує будь-які пробіли/таби
+    working = " ".join(raw.split())
+
+    return _parse_canonical(working, raw) or _parse_general(working, raw)
+
+
+def _canonical_is_safe(g: Dict[str, Optional[str]]) -> bool:
+    """Чи дасть загальний парсер для цього fullmatch той самий результат."""
+    for key in ("via_name", "via_num", "scala", "interno", "piano"):
+        value = g[key]
+        if value and _CANONICAL_UNSAFE_REGEX.search(value):
+            return False
+    for key in ("via_num", "piano"):
+        value = g[key]
+        if value and value[-1] in _NON_WORD_TAIL:
+            return False
+    if g["piano"] and not _NON_WORD_TAIL.isdisjoint(g["piano"]):
+        return False
+    if g["snc"] and _TRAILING_N_REGEX.search(g["via_name"]):
+        return False
+    return True
+
+
+def _parse_canonical(working: str, raw: str) -> Optional[AddressParts]:
+    """
+    0) Канонічний формат SISTER — один fullmatch.
+    None, якщо рядок не канонічний або fast path розійшовся б із загальним парсером.
+    """
+    m = _ADDRESS_REGEX.fullmatch(working)
+    if not m:
+        return None
+    g = m.groupdict()
+    if not _canonical_is_safe(g):
+        return None
+    return AddressParts(
+        via_type=_normalize_street_type(g["via_type"]),
+        via_name=g["via_name"],
+        via_num=None if g["snc"] else g["via_num"],
+        scala=g["scala"].upper() if g["scala"] else None,
+        interno=g["interno"].upper() if g["interno"] else None,
+        piano=g["piano"].upper() if g["piano"] else None,
+        indirizzo_raw=raw,
+    )
+
+
+def _parse_general(working: str, raw: str) -> AddressParts:
+    """Загальний парсер (кроки 1-5) для будь-якого формату адреси."""
 
     # ----------------------------
     # 1. Street type + base name
@@ -140,12 +259,7 @@ def parse_address(text: str) -> AddressParts:
 
     m = _STREET_TYPE_REGEX.match(working)
     if m:
-        via_type = (
-            m.group(1)
-            .upper()
-            .replace(".", "")
-            .replace("PZZA", "PIAZZA")
-        )
+        via_type = _normalize_street_type(m.group(1))
         via_name = m.group(2).strip()
     else:
         # Нема типу — вважаємо все назвою
@@ -205,7 +319,7 @@ def parse_address(text: str) -> AddressParts:
     # 5. Final cleanup
     # ----------------------------
 
-    via_name = re.sub(r"\s{2,}", " ", working_tail).strip() or None
+    via_name = _MULTISPACE_REGEX.sub(" ", working_tail).strip() or None
 
     return AddressParts(
         via_type=via_type,
@@ -215,4 +329,15 @@ def parse_address(text: str) -> AddressParts:
         interno=interno,
         piano=piano,
         indirizzo_raw=raw,
-    )
\ No newline at end of file
+    )
+
+
+def scan_many(texts: Iterable[str]) -> List[AddressParts]:
+    """
+    Пакетний парсинг адрес (наприклад, усі рядки таблиць однієї візури).
+
+    Повтори адреси (у візурі вона часто однакова для кількох immobili)
+    віддає lru_cache у parse_address. Порядок результатів відповідає
+    порядку вхідних рядків.
+    """
+    return [parse_address(text) for text in texts]
@@ -3,12 +3,13 @@ from __future__ import annotations
 from pathlib import Path
 import logging
 import re
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Set
 
 import fitz
-import camelot
+import pandas as pd
+import pdfplumber
 
-from uppi.parsers.address_parser import parse_address
+from uppi.parsers.address_parser import scan_many
 
 logger = logging.getLogger(__name__)
 
@@ -16,6 +17,17 @@ DOWNLOADS_DIR = Path(__file__).resolve().parents[2] / "downloads"
 
 PDF_PATH = DOWNLOADS_DIR / "sample_visura.pdf"
 
+_HEADER_SEP_RE = re.compile(r"[^A-Za-z0-9]+")
+
+
+class _Table:
+    """Мінімальна обгортка над DataFrame таблиці (інтерфейс як у camelot.Table)."""
+
+    __slots__ = ("df",)
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+
 
 class VisuraParser:
     """
@@ -29,9 +41,11 @@ class VisuraParser:
         - locatore_* та immobile_comune/immobile_comune_code (для збагачення)
     """
 
+    # MULTILINE: ^ — початок будь-якого рядка, тож шукаємо одним search по тексту сторінки.
+    # Між токенами лише [ \t]: \s перескочив би \n і склеїв сусідні рядки
     NAME_CF = re.compile(
-        r"^([A-ZÀÈÌÒÙ]{2,})\s+([A-Za-zÀÈÌÒÙ]+)\s+\(CF:\s*([A-Z0-9]{16})\)",
-        re.UNICODE,
+        r"^[ \t]*([A-ZÀÈÌÒÙ]{2,})[ \t]+([A-Za-zÀÈÌÒÙ]+)[ \t]+\(CF:[ \t]*([A-Z0-9]{16})\)",
+        re.UNICODE | re.MULTILINE,
     )
 
     COMUNE_TABLE = re.compile(
@@ -59,24 +73,22 @@ class VisuraParser:
 
         all_immobili: List[Dict[str, Any]] = []
         try:
-            name_data = self._extract_name_cf(doc)
-
-            for page_idx in range(len(doc)):
-                page = doc[page_idx]
-                comune_name, comune_code = self._extract_comune_for_page(page)
-
-                try:
-                    tables = camelot.read_pdf(pdf_path, pages=str(page_idx + 1), flavor="lattice")
-                except Exception as e:
-                    logger.exception(
-                        "[VISURA_PARSER] Помилка Camelot на сторінці %d (%s): %s",
-                        page_idx + 1,
-                        pdf_path,
-                        e,
-                    )
-                    continue
-
-                for table in tables:
+            # Текст кожної сторінки беремо з fitz один раз: для ім'я/CF, comune
+            # і для відсіву сторінок без таблиць immobili
+            page_texts = [page.get_text("text") for page in doc]
+
+            name_data = self._extract_name_cf(page_texts[0] if page_texts else "")
+            table_pages = {
+                page_idx + 1
+                for page_idx, text in enumerate(page_texts)
+                if self._may_have_real_estate_table(text)
+            }
+            tables_by_page = self._read_tables_by_page(pdf_path, table_pages)
+
+            for page_idx, page_text in enumerate(page_texts):
+                comune_name, comune_code = self._extract_comune_for_page(page_text)
+
+                for table in tables_by_page.get(page_idx + 1, ()):
                     parsed = self._process_table(table)
                     if parsed is None:
                         continue
@@ -100,8 +112,52 @@ class VisuraParser:
         finally:
             doc.close()
 
+    # Лінійні (ruled) таблиці візури: межі комірок — лише по намальованих лініях
+    TABLE_SETTINGS = {"vertical_strategy": "lines", "horizontal_strategy": "lines"}
+
+    def _may_have_real_estate_table(self, page_text: str) -> bool:
+        """
+        Дешевий текстовий фільтр: таблиця immobili завжди має колонку 'Foglio'.
+        Сторінки з інтестазіоні не відкидаємо — там буває й таблиця immobili.
+        """
+        return "FOGLIO" in page_text.upper()
+
+    def _read_tables_by_page(self, pdf_path: str, pages: Set[int]) -> Dict[int, List[Any]]:
+        """
+        pdfplumber по сторінках з pages (1-based) з розкладкою таблиць
+        за номером сторінки. Кожна таблиця — _Table з .df,
+        як у Camelot, тож _process_table не змінюється.
+        """
+        tables_by_page: Dict[int, List[Any]] = {}
+        if not pages:
+            return tables_by_page
+        try:
+            pdf = pdfplumber.open(pdf_path)
+        except Exception as e:
+            logger.exception("[VISURA_PARSER] Не вдалося відкрити PDF у pdfplumber %s: %s", pdf_path, e)
+            return tables_by_page
+
+        with pdf:
+            for page_number in sorted(pages):
+                # Збій однієї сторінки не повинен губити таблиці решти
+                try:
+                    page_tables = pdf.pages[page_number - 1].extract_tables(self.TABLE_SETTINGS)
+                except Exception as e:
+                    logger.exception(
+                        "[VISURA_PARSER] Помилка pdfplumber на сторінці %d (%s): %s",
+                        page_number,
+                        pdf_path,
+                        e,
+                    )
+                    continue
+
+                for rows in page_tables:
+                    df = pd.DataFrame(rows).fillna("")
+                    tables_by_page.setdefault(page_number, []).append(_Table(df))
+        return tables_by_page
+
     def _normalize_header(self, header: str) -> str:
-        snake = re.sub(r"[^A-Za-z0-9]+", "_", header).strip("_").lower()
+        snake = _HEADER_SEP_RE.sub("_", header).strip("_").lower()
 
         if snake == "microzona":
             return "micro_zona"
@@ -112,26 +168,19 @@ class VisuraParser:
 
         return snake
 
-    def _extract_name_cf(self, doc) -> Dict[str, Any]:
-        page = doc[0]
-        blocks = page.get_text("blocks")
-
-        for _, _, _, _, text, *_ in blocks:
-            for line in text.splitlines():
-                m = self.NAME_CF.match(line.strip())
-                if m:
-                    locatore_surname, locatore_name, cf = m.groups()
-                    return {"locatore_surname": locatore_surname, "locatore_name": locatore_name, "cf": cf}
+    def _extract_name_cf(self, first_page_text: str) -> Dict[str, Any]:
+        m = self.NAME_CF.search(first_page_text)
+        if m:
+            locatore_surname, locatore_name, cf = m.groups()
+            return {"locatore_surname": locatore_surname, "locatore_name": locatore_name, "cf": cf}
 
         logger.warning("[VISURA_PARSER] Не вдалося знайти ім'я/CF на першій сторінці")
         return {"locatore_surname": None, "locatore_name": None, "cf": None}
 
-    def _extract_comune_for_page(self, page) -> tuple[str | None, str | None]:
-        txt = page.get_text("text")
-        for line in txt.splitlines():
-            m = self.COMUNE_TABLE.search(line.strip())
-            if m:
-                return m.group(1), m.group(2)
+    def _extract_comune_for_page(self, page_text: str) -> tuple[str | None, str | None]:
+        m = self.COMUNE_TABLE.search(page_text)
+        if m:
+            return m.group(1), m.group(2)
         return None, None
 
     def _process_table(self, table):
@@ -175,28 +224,32 @@ class VisuraParser:
 
         header = [self._normalize_header(col) for col in normalized_header]
 
-        rows: List[Dict[str, Any]] = []
-        for i in range(data_start_row, len(df)):
-            row_dict: Dict[str, Any] = {}
-
-            for col_index, col_name in enumerate(header):
-                raw_value = df.iloc[i, col_index].strip()
-
-                if "indirizzo" in col_name:
-                    row_dict.update(parse_address(raw_value).as_dict())
-                    continue
-
-                if col_name == "superficie_catastale":
-                    row_dict.update(self._parse_superficie(raw_value))
-                    continue
-
-                if col_name == "rendita":
-                    row_dict.update(self._parse_rendita(raw_value))
-                    continue
-
-                row_dict[col_name] = raw_value
+        # Дані таблиці: strip по колонках (векторно), без проходу по кожній комірці
+        data = df.iloc[data_start_row:, : len(header)]
+        if data.empty:
+            return None
+        data = data.apply(lambda col: col.astype(str).str.strip())
+
+        rows: List[Dict[str, Any]] = [{} for _ in range(len(data))]
+        for col_index, col_name in enumerate(header):
+            column = data.iloc[:, col_index]
+
+            if "indirizzo" in col_name:
+                # Уся колонка адрес — одним батчем (канонічний формат іде через один fullmatch)
+                parsed = [parts.as_dict() for parts in scan_many(column)]
+            elif col_name == "superficie_catastale":
+                parsed = column.map(self._parse_superficie)
+            elif col_name == "rendita":
+                parsed = column.map(self._parse_rendita)
+            else:
+                for row_dict, value in zip(rows, column):
+                    row_dict[col_name] = value
+                continue
 
-            rows.append(row_dict)
+            # Поля, що розкладаються на кілька ключів (адреса, площа, рендита)
+            for row_dict, fields in zip(rows, parsed):
+                if fields:
+                    row_dict.update(fields)
 
         return {"immobili": rows} if rows else None
 
@@ -1,16 +1,49 @@
 # uppi/pipelines.py
 from __future__ import annotations
 
+from typing import Dict
+
+from decouple import config
+from itemadapter import ItemAdapter
+from twisted.internet import defer, threads
+
 from uppi.services.visura_processor import VisuraProcessor
+from uppi.utils.parse_utils import clean_str
+
+# Скільки item-ів обробляємо паралельно в потоках реактора.
+# Має бути менше за DB_POOL_MAX_SIZE: кожен item тримає конекшн із пулу.
+PIPELINE_WORKERS = config("PIPELINE_WORKERS", default=4, cast=int)
 
 
 class UppiPipeline:
     """
     Minimal glue: delegate item processing to VisuraProcessor service.
+    Блокуючий I/O (PostgreSQL, MinIO, DOCX) виконується через deferToThread,
+    щоб не блокувати реактор Scrapy. Item-и одного LOCATORE_CF (кілька записів
+    у clients.yml) обробляються строго по черзі: вони пишуть ті самі рядки в БД,
+    той самий PDF візури й ті самі файли атестацій. Різні CF ідуть паралельно.
     """
 
     def __init__(self):
         self.processor = VisuraProcessor()
+        self._slots = defer.DeferredSemaphore(max(1, PIPELINE_WORKERS))
+        self._cf_locks: Dict[str, defer.DeferredLock] = {}
 
     def process_item(self, item, spider):
-        return self.processor.process_item(item, spider)
+        adapter = ItemAdapter(item)
+        cf = clean_str(adapter.get("locatore_cf") or adapter.get("codice_fiscale")) or ""
+
+        lock = self._cf_locks.get(cf)
+        if lock is None:
+            lock = self._cf_locks[cf] = defer.DeferredLock()
+
+        # Спершу lock CF, потім слот семафора: item, що чекає на свій CF, слот не займає
+        d = lock.run(self._slots.run, threads.deferToThread, self.processor.process_item, item, spider)
+        d.addBoth(self._release_cf_lock, cf, lock)
+        return d
+
+    def _release_cf_lock(self, result, cf: str, lock: defer.DeferredLock):
+        # Прибираємо lock, коли на нього вже ніхто не чекає, щоб dict не ріс на кожен CF
+        if not lock.locked and not lock.waiting and self._cf_locks.get(cf) is lock:
+            del self._cf_locks[cf]
+        return result
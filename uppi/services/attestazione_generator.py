@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List
+from typing import Any, Dict
 
 from uppi.domain.immobile import Immobile
 from uppi.utils.audit import format_person_fullname
@@ -14,6 +14,85 @@ ELEMENT_KEYS = (
     + [f"d{i}" for i in range(1, 14)]
 )
 
+# Плейсхолдери хрестиків a1..d14 у двох регістрах ({{A1}} і {{a1}}) — рахуються
+# один раз при імпорті, а не форматуються f-string'ами на кожен immobile
+_ELEMENT_PLACEHOLDERS = tuple(
+    (key, f"{{{{{key.upper()}}}}}", f"{{{{{key.lower()}}}}}")
+    for key in (f"{grp}{i}" for grp in "abcd" for i in range(1, 15))
+)
+
+# Адреса орендодавця: (плейсхолдер, ключ override, ключ адреси з БД, ключ адаптера).
+# Пріоритет: Override -> Дані з БД (адреса особи) -> Adapter
+_LOCATORE_ADDRESS_PARAMS = (
+    ("{{LOCATORE_COMUNE_RES}}", "locatore_comune_res", "comune", "locatore_comune_res"),
+    ("{{LOCATORE_VIA}}", "locatore_via", "via_full", "locatore_via"),
+    ("{{LOCATORE_CIVICO}}", "locatore_civico", "civico", "locatore_civico"),
+)
+
+# Адреса об'єкта: (плейсхолдер, ключ override, ключ реальної адреси з БД)
+_IMMOBILE_ADDRESS_PARAMS = (
+    ("{{IMMOBILE_COMUNE}}", "immobile_comune_override", "comune"),
+    ("{{IMMOBILE_VIA}}", "immobile_via_override", "via"),
+    ("{{IMMOBILE_CIVICO}}", "immobile_civico_override", "civico"),
+    ("{{IMMOBILE_PIANO}}", "immobile_piano_override", "piano"),
+    ("{{IMMOBILE_INTERNO}}", "immobile_interno_override", "interno"),
+)
+
+# Поля, які беруться СУВОРО з адаптера (YAML): (плейсхолдер, ключ адаптера)
+_YAML_ONLY_PARAMS = (
+    # реєстраційні дані контракту
+    ("{{CONTRATTO_DATA}}", "contratto_data"),
+    ("{{DECORRENZA_DATA}}", "decorrenza_data"),
+    ("{{REGISTRAZIONE_DATA}}", "registrazione_data"),
+    ("{{REGISTRAZIONE_NUM}}", "registrazione_num"),
+    ("{{AGENZIA_ENTRATE_SEDE}}", "agenzia_entrate_sede"),
+    # орендар (CONDUTTORE)
+    ("{{CONDUTTORE_NOME}}", "conduttore_nome"),
+    ("{{CONDUTTORE_CF}}", "conduttore_cf"),
+    ("{{CONDUTTORE_COMUNE}}", "conduttore_comune"),
+    ("{{CONDUTTORE_VIA}}", "conduttore_via"),
+)
+
+# GARAGE/BOX/CANTINA і POSTO AUTO у шаблоні поки не заповнюються — завжди порожні
+_EMPTY_GAR_PST_PARAMS: Dict[str, str] = {
+    f"{{{{{prefix}_{suffix}}}}}": ""
+    for prefix in ("GAR", "PST")
+    for suffix in ("FOGL", "PART", "SUB", "REND", "SCAT", "SRIP", "CAT")
+}
+
+# Плейсхолдери канону: за замовчуванням порожні, заповнюються нижче з canone_calc
+_EMPTY_CAN_PARAMS: Dict[str, str] = {
+    f"{{{{{ph}}}}}": ""
+    for ph in (
+        "CAN_ZONA",
+        "CAN_SUBFASCIA",
+        "CAN_MQ",
+        "CAN_MQ_ANNUO",
+        "CAN_ISTAT",
+        "CAN_TOTALE_ANNUO",
+        "CAN_ARREDATO",
+        "CAN_CLASSE_A",
+        "CAN_CLASSE_B",
+        "CAN_ENERGY",
+        "CAN_DURATA",
+        "CAN_TRANSITORIO",
+        "CAN_STUDENTI",
+        "CAN_ANNUO_VAR_MIN",
+        "CAN_ANNUO_VAR_MAX",
+        "CAN_MENSILE_VAR_MIN",
+        "CAN_MENSILE_VAR_MAX",
+        "CAN_MENSILE",
+    )
+}
+
+# Ключі елементів по групах для {{A_CNT}}..{{D_CNT}}
+_ELEMENT_COUNT_GROUPS = (
+    ("{{A_CNT}}", ("a1", "a2")),
+    ("{{B_CNT}}", tuple(f"b{i}" for i in range(1, 6))),
+    ("{{C_CNT}}", tuple(f"c{i}" for i in range(1, 8))),
+    ("{{D_CNT}}", tuple(f"d{i}" for i in range(1, 14))),
+)
+
 
 def build_template_params(adapter, imm: Immobile, contract_ctx: Dict[str, Any]) -> Dict[str, str]:
     params: Dict[str, str] = {}
@@ -33,128 +112,67 @@ def build_template_params(adapter, imm: Immobile, contract_ctx: Dict[str, Any])
     params["{{LOCATORE_NOME}}"] = format_person_fullname(loc.get("name"), loc.get("surname"))
     
     # Пріоритет: Override -> Дані з БД (адреса особи) -> Adapter
-    params["{{LOCATORE_COMUNE_RES}}"] = str(overrides.get("locatore_comune_res") or loc_addr.get("comune") or adapter.get("locatore_comune_res") or "")
-    params["{{LOCATORE_VIA}}"] = str(overrides.get("locatore_via") or loc_addr.get("via_full") or adapter.get("locatore_via") or "")
-    params["{{LOCATORE_CIVICO}}"] = str(overrides.get("locatore_civico") or loc_addr.get("civico") or adapter.get("locatore_civico") or "")
+    for ph, override_key, addr_key, adapter_key in _LOCATORE_ADDRESS_PARAMS:
+        params[ph] = str(overrides.get(override_key) or loc_addr.get(addr_key) or adapter.get(adapter_key) or "")
 
     # 2. ДАНІ ОБ'ЄКТА НЕРУХОМОСТІ (IMMOBILE)
     # Використовуємо реальну адресу об'єкта з БД (immobile_address)
     imm_addr = contract_ctx.get("immobile") or {}
     
-    params["{{IMMOBILE_COMUNE}}"] = str(overrides.get("immobile_comune_override") or imm_addr.get("comune") or "")
-    params["{{IMMOBILE_VIA}}"] = str(overrides.get("immobile_via_override") or imm_addr.get("via") or "")
-    params["{{IMMOBILE_CIVICO}}"] = str(overrides.get("immobile_civico_override") or imm_addr.get("civico") or "")
-    params["{{IMMOBILE_PIANO}}"] = str(overrides.get("immobile_piano_override") or imm_addr.get("piano") or "")
-    params["{{IMMOBILE_INTERNO}}"] = str(overrides.get("immobile_interno_override") or imm_addr.get("interno") or "")
-
-    # Кадастрові дані (з об'єкта Immobile)
-    params["{{FOGLIO}}"] = str(getattr(imm, "foglio", "") or "")
-    params["{{NUMERO}}"] = str(getattr(imm, "numero", "") or "")
-    params["{{SUB}}"] = str(getattr(imm, "sub", "") or "")
-    params["{{RENDITA}}"] = str(getattr(imm, "rendita", "") or "")
-    params["{{SUPERFICIE_TOTALE}}"] = str(getattr(imm, "superficie_totale", "") or "")
-    params["{{CATEGORIA}}"] = str(getattr(imm, "categoria", "") or "")
+    for ph, override_key, addr_key in _IMMOBILE_ADDRESS_PARAMS:
+        params[ph] = str(overrides.get(override_key) or imm_addr.get(addr_key) or "")
+
+    # Кадастрові дані (з об'єкта Immobile): кожне поле рахуємо один раз
+    foglio_s = str(imm.foglio or "")
+    numero_s = str(imm.numero or "")
+    sub_s = str(imm.sub or "")
+    rendita_s = str(imm.rendita or "")
+    superficie_s = str(imm.superficie_totale or "")
+    categoria_s = str(imm.categoria or "")
+
+    params["{{FOGLIO}}"] = foglio_s
+    params["{{NUMERO}}"] = numero_s
+    params["{{SUB}}"] = sub_s
+    params["{{RENDITA}}"] = rendita_s
+    params["{{SUPERFICIE_TOTALE}}"] = superficie_s
+    params["{{CATEGORIA}}"] = categoria_s
 
     # APPARTAMENTO 
-    params["{{APP_FOGL}}"] = params["{{FOGLIO}}"]
-    params["{{APP_PART}}"] = params["{{NUMERO}}"]
-    params["{{APP_SUB}}"] = params["{{SUB}}"]
-    params["{{APP_REND}}"] = params["{{RENDITA}}"]
-    params["{{APP_SCAT}}"] = params["{{SUPERFICIE_TOTALE}}"]
+    params["{{APP_FOGL}}"] = foglio_s
+    params["{{APP_PART}}"] = numero_s
+    params["{{APP_SUB}}"] = sub_s
+    params["{{APP_REND}}"] = rendita_s
+    params["{{APP_SCAT}}"] = superficie_s
     params["{{APP_SRIP}}"] = "X"
-    params["{{APP_CAT}}"] = params["{{CATEGORIA}}"]
-
-    # GARAGE/BOX/CANTINA
-    params["{{GAR_FOGL}}"] = "X"
-    params["{{GAR_PART}}"] = "X"
-    params["{{GAR_SUB}}"] = "X"
-    params["{{GAR_REND}}"] = "X"
-    params["{{GAR_SCAT}}"] = "X"
-    params["{{GAR_SRIP}}"] = "X"
-    params["{{GAR_CAT}}"] = "X"
-    
-    # POSTO AUTO
-    params["{{PST_FOGL}}"] = "X"
-    params["{{PST_PART}}"] = "X"
-    params["{{PST_SUB}}"] = "X"
-    params["{{PST_REND}}"] = "X"
-    params["{{PST_SCAT}}"] = "X"
-    params["{{PST_SRIP}}"] = "X"
-    params["{{PST_CAT}}"] = "X"
+    params["{{APP_CAT}}"] = categoria_s
+
+    # GARAGE/BOX/CANTINA і POSTO AUTO
+    params.update(_EMPTY_GAR_PST_PARAMS)
 
     # TOTALE
-    params["{{TOT_SCAT}}"] = params["{{SUPERFICIE_TOTALE}}"]
+    params["{{TOT_SCAT}}"] = superficie_s
     params["{{TOT_SRIP}}"] = "X"
     params["{{TOT_CAT}}"] = "X"
 
-    for prefix in ("GAR", "PST"):
-        for suffix in ("FOGL", "PART", "SUB", "REND", "SCAT", "SRIP", "CAT"):
-            params[f"{{{{{prefix}_{suffix}}}}}"] = ""
-
-# 3. ДАНІ КОНТРАКТУ
+# 3. ДАНІ КОНТРАКТУ + 4. ДАНІ ОРЕНДАРЯ (CONDUTTORE)
     # !!! Беремо СУВОРО з адаптера (YAML) для реєстраційних даних, 
     # щоб ігнорувати старі записи в БД, якщо в YAML пусто.
-
-    # --- БЕРЕТЬСЯ Тільки з YAML ---
-    params["{{CONTRATTO_DATA}}"] = clean_str(adapter.get("contratto_data")) or ""
-    params["{{DECORRENZA_DATA}}"] = clean_str(adapter.get("decorrenza_data")) or ""
-    params["{{REGISTRAZIONE_DATA}}"] = clean_str(adapter.get("registrazione_data")) or ""
-    params["{{REGISTRAZIONE_NUM}}"] = clean_str(adapter.get("registrazione_num")) or ""
-    params["{{AGENZIA_ENTRATE_SEDE}}"] = clean_str(adapter.get("agenzia_entrate_sede")) or ""
-    # ---------------------------------
-
-    # 4. ДАНІ ОРЕНДАРЯ (CONDUTTORE)
-    # !!! ТУТ ЗМІНИ: Ігноруємо БД (parties.get("CONDUTTORE")), беремо тільки з YAML.
+    # Орендаря теж: ігноруємо БД (parties.get("CONDUTTORE")), беремо тільки з YAML.
     # Якщо в YAML пусто -> буде пуста строка -> будуть підкреслення.
-    
-    cond_nome = clean_str(adapter.get("conduttore_nome")) or ""
-    cond_cf = clean_str(adapter.get("conduttore_cf")) or ""
-    cond_comune = clean_str(adapter.get("conduttore_comune")) or ""
-    cond_via = clean_str(adapter.get("conduttore_via")) or ""
-
-    params["{{CONDUTTORE_NOME}}"] = cond_nome
-    params["{{CONDUTTORE_CF}}"] = cond_cf
-    params["{{CONDUTTORE_COMUNE}}"] = cond_comune
-    params["{{CONDUTTORE_VIA}}"] = cond_via
+    for ph, adapter_key in _YAML_ONLY_PARAMS:
+        params[ph] = clean_str(adapter.get(adapter_key)) or ""
 
     # ЕЛЕМЕНТИ A-D (Заповнення хрестиків)
-    for grp in ['a', 'b', 'c', 'd']:
-        for i in range(1, 15):
-            key = f"{grp}{i}"  # генерує a1, a2... d14
-            val = str(elements.get(key, "") or "")
-            # Заповнюємо різні варіанти тегів, які можуть бути у Word
-            params[f"{{{{{key.upper()}}}}}"] = val # {{{A1}}} (якщо docxtpl потребує явних дужок)
-            params[f"{{{{{key.lower()}}}}}"] = val              # {{a1}}
-
-    def cnt(keys: List[str]) -> int:
-        return sum(1 for k in keys if str(elements.get(k, "") or "").strip() != "")
-
-    params["{{A_CNT}}"] = str(cnt(["a1", "a2"]))
-    params["{{B_CNT}}"] = str(cnt([f"b{i}" for i in range(1, 6)]))
-    params["{{C_CNT}}"] = str(cnt([f"c{i}" for i in range(1, 8)]))
-    params["{{D_CNT}}"] = str(cnt([f"d{i}" for i in range(1, 14)]))
-
-    for ph in [
-        "CAN_ZONA",
-        "CAN_SUBFASCIA",
-        "CAN_MQ",
-        "CAN_MQ_ANNUO",
-        "CAN_ISTAT",
-        "CAN_TOTALE_ANNUO",
-        "CAN_ARREDATO",
-        "CAN_CLASSE_A",
-        "CAN_CLASSE_B",
-        "CAN_ENERGY",
-        "CAN_DURATA",
-        "CAN_TRANSITORIO",
-        "CAN_STUDENTI",
-        "CAN_ANNUO_VAR_MIN",
-        "CAN_ANNUO_VAR_MAX",
-        "CAN_MENSILE_VAR_MIN",
-        "CAN_MENSILE_VAR_MAX",
-        "CAN_MENSILE",
-    ]:
-        params[f"{{{{{ph}}}}}"] = ""
+    for key, upper_ph, lower_ph in _ELEMENT_PLACEHOLDERS:
+        val = str(elements.get(key, "") or "")
+        # Заповнюємо різні варіанти тегів, які можуть бути у Word
+        params[upper_ph] = val  # {{A1}}
+        params[lower_ph] = val  # {{a1}}
+
+    for cnt_ph, keys in _ELEMENT_COUNT_GROUPS:
+        params[cnt_ph] = str(sum(1 for k in keys if str(elements.get(k, "") or "").strip() != ""))
+
+    params.update(_EMPTY_CAN_PARAMS)
 
     def _fmt_num(x, decimals=2) -> str:
         """ Форматує число з фіксованою кількістю десяткових знаків."""
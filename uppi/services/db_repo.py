@@ -1,11 +1,15 @@
 # uppi/services/db_repo.py
 from __future__ import annotations
 
+import csv
+import io
 import json
 import logging
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Any, Dict, List, Optional, Tuple
+from functools import lru_cache
+from operator import attrgetter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
 import psycopg2
 import psycopg2.extras
@@ -26,6 +30,9 @@ ELEMENT_KEYS = (
     + [f"d{i}" for i in range(1, 14)]
 )
 
+# Розмір пачки для server-side курсора в db_load_immobili
+IMMOBILI_STREAM_ITERSIZE = 1000
+
 # Список колонок, які ми очікуємо отримати з парсера/Immobile об'єкта
 # (використовується для формування словника перед вставкою)
 IMMOBILI_PARSED_COLUMNS = [
@@ -56,6 +63,15 @@ IMMOBILI_PARSED_COLUMNS = [
 ]
 
 
+_IMMOBILE_ROW_GETTER = attrgetter(*IMMOBILI_PARSED_COLUMNS)
+_IMMOBILE_ROW_CLEANERS = tuple(
+    clean_sub if col == "sub"
+    else safe_float if col in ("superficie_totale", "superficie_escluse")
+    else clean_str
+    for col in IMMOBILI_PARSED_COLUMNS
+)
+
+
 # ---------------------------------------------------------
 # Допоміжна функція для логіки "Smart Patch"
 # ---------------------------------------------------------
@@ -100,32 +116,27 @@ def immobile_db_row(imm: Immobile) -> Dict[str, Any]:
     Перетворює об'єкт Immobile у словник для подальшої обробки/вставки.
     Виконує очистку рядків та нормалізацію sub/foglio/numero.
     """
-    row: Dict[str, Any] = {}
-
-    for col in IMMOBILI_PARSED_COLUMNS:
-        raw = getattr(imm, col, None)
-
-        if col == "sub":
-            row[col] = clean_sub(raw)
-            continue
-
-        if col in ("superficie_totale", "superficie_escluse"):
-            row[col] = safe_float(raw)
-            continue
-
-        row[col] = clean_str(raw)
+    # attrgetter (C) дістає всі колонки одним викликом; очистка — з таблиці
+    # конвертерів. clean_str вже робить strip, а clean_sub повертає '' замість None,
+    # тож окрема нормалізація foglio/numero/sub не потрібна.
+    return {
+        col: clean(val)
+        for col, clean, val in zip(IMMOBILI_PARSED_COLUMNS, _IMMOBILE_ROW_CLEANERS, _IMMOBILE_ROW_GETTER(imm))
+    }
 
-    # Нормалізація критичних полів (видалення пробілів)
-    if row.get("foglio") is not None:
-        row["foglio"] = str(row["foglio"]).strip()
-    if row.get("numero") is not None:
-        row["numero"] = str(row["numero"]).strip()
-    
-    # Гарантуємо, що sub - це рядок (навіть порожній), а не None
-    if row.get("sub") is None:
-        row["sub"] = ""
 
-    return row
+def immobile_db_rows(imms: Iterable[Immobile]) -> List[Dict[str, Any]]:
+    """
+    Batch-варіант immobile_db_row для всіх immobili візури: колонки, конвертери
+    й getter зв'язуються в локальні змінні один раз на батч, а не на кожен рядок.
+    """
+    cols = IMMOBILI_PARSED_COLUMNS
+    cleaners = _IMMOBILE_ROW_CLEANERS
+    getter = _IMMOBILE_ROW_GETTER
+    return [
+        {col: clean(val) for col, clean, val in zip(cols, cleaners, getter(imm))}
+        for imm in imms
+    ]
 
 
 # =========================================================
@@ -321,6 +332,30 @@ def fetch_visura_state(conn, cf: str) -> Optional[VisuraState]:
     return VisuraState(cf=row[0], pdf_bucket=row[1], pdf_object=row[2], fetched_at=row[3], id=row[4])
 
 
+def fetch_visura_states_many(conn, cfs: List[str]) -> Dict[str, VisuraState]:
+    """
+    Batch-варіант fetch_visura_state: один запит `= ANY(%s)` на всіх клієнтів.
+    Повертає {cf: VisuraState}; CF без візури у результаті відсутні.
+    """
+    cfs = list(dict.fromkeys(cf for cf in cfs if cf))
+    if not cfs:
+        return {}
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            SELECT locatore_cf, pdf_bucket, pdf_object, fetched_at, id
+            FROM public.visure
+            WHERE locatore_cf = ANY(%s);
+            """,
+            (cfs,),
+        )
+        rows = cur.fetchall()
+    return {
+        row[0]: VisuraState(cf=row[0], pdf_bucket=row[1], pdf_object=row[2], fetched_at=row[3], id=row[4])
+        for row in rows
+    }
+
+
 # =========================================================
 # 4. IMMOBILI (Master Data - Updated)
 # =========================================================
@@ -415,6 +450,144 @@ def db_upsert_immobile(
         logger.error(f"[DB] Immobile upsert failed for CF={owner_cf} F={foglio} N={numero} S={sub}: {e}")
         raise
 
+# 4.1.1 Bulk upsert Immobili (один round-trip на всю візуру)
+
+_IMMOBILE_BULK_COLUMNS = (
+    "owner_cf", "source_visura_id", "visura_address_id",
+    "sez_urbana", "foglio", "numero", "sub",
+    "zona_cens", "micro_zona", "categoria", "classe", "consistenza", "rendita",
+    "superficie_totale", "superficie_escluse", "superficie_raw",
+)
+
+# Колонки, які ON CONFLICT не оновлює: при дублікатах у батчі лишається перше значення
+_IMMOBILE_INSERT_ONLY = frozenset({"owner_cf", "sez_urbana", "foglio", "numero", "sub"})
+
+_IMMOBILE_BULK_COLS_SQL = ", ".join(_IMMOBILE_BULK_COLUMNS)
+
+_IMMOBILE_BULK_ON_CONFLICT = """
+    ON CONFLICT (owner_cf, foglio, numero, sub) DO UPDATE
+    SET
+        source_visura_id   = COALESCE(EXCLUDED.source_visura_id, immobili.source_visura_id),
+        visura_address_id  = COALESCE(EXCLUDED.visura_address_id, immobili.visura_address_id),
+
+        zona_cens          = COALESCE(EXCLUDED.zona_cens, immobili.zona_cens),
+        micro_zona         = COALESCE(EXCLUDED.micro_zona, immobili.micro_zona),
+        categoria          = COALESCE(EXCLUDED.categoria, immobili.categoria),
+        classe             = COALESCE(EXCLUDED.classe, immobili.classe),
+        consistenza        = COALESCE(EXCLUDED.consistenza, immobili.consistenza),
+        rendita            = COALESCE(EXCLUDED.rendita, immobili.rendita),
+        superficie_totale  = COALESCE(EXCLUDED.superficie_totale, immobili.superficie_totale),
+        superficie_escluse = COALESCE(EXCLUDED.superficie_escluse, immobili.superficie_escluse),
+        superficie_raw     = COALESCE(EXCLUDED.superficie_raw, immobili.superficie_raw),
+        updated_at         = now()
+    RETURNING id
+"""
+
+# Готові тексти запитів bulk-upsert: збираються один раз при імпорті, а не на кожен item
+_IMMOBILE_BULK_INSERT_SQL = (
+    f"INSERT INTO public.immobili ({_IMMOBILE_BULK_COLS_SQL}) VALUES %s {_IMMOBILE_BULK_ON_CONFLICT}"
+)
+_IMMOBILE_STAGE_CREATE_SQL = f"""
+    CREATE TEMP TABLE _immobili_stage ON COMMIT DROP AS
+    SELECT {_IMMOBILE_BULK_COLS_SQL} FROM public.immobili WITH NO DATA;
+"""
+_IMMOBILE_STAGE_COPY_SQL = (
+    f"COPY _immobili_stage ({_IMMOBILE_BULK_COLS_SQL}) FROM STDIN WITH (FORMAT CSV, NULL '\\N')"
+)
+_IMMOBILE_STAGE_UPSERT_SQL = f"""
+    INSERT INTO public.immobili ({_IMMOBILE_BULK_COLS_SQL})
+    SELECT {_IMMOBILE_BULK_COLS_SQL} FROM _immobili_stage
+    {_IMMOBILE_BULK_ON_CONFLICT}
+"""
+
+# Від скількох рядків execute_values поступається COPY через staging-таблицю
+IMMOBILI_COPY_THRESHOLD = 1000
+
+
+def db_upsert_immobili_bulk(
+    conn,
+    owner_cf: str,
+    items: List[Tuple[Immobile, Optional[int]]],
+    source_visura_id: Optional[int] = None,
+) -> List[int]:
+    """
+    Batch-варіант db_upsert_immobile: усі immobili візури одним
+    INSERT ... VALUES ... ON CONFLICT через execute_values.
+    items — список (Immobile, visura_address_id). Повертає ID у порядку
+    унікальних (foglio, numero, sub).
+    """
+    merged: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+    rows_clean = immobile_db_rows(imm for imm, _ in items)
+    for row, (_, visura_addr_id) in zip(rows_clean, items):
+        foglio = row.get("foglio")
+        numero = row.get("numero")
+        if not foglio or not numero:
+            raise ValueError(
+                f"Cannot upsert immobile without foglio+numero. "
+                f"Got foglio={foglio!r}, numero={numero!r}, owner_cf={owner_cf!r}"
+            )
+
+        values = {
+            "owner_cf": owner_cf,
+            "source_visura_id": source_visura_id,
+            "visura_address_id": visura_addr_id,
+            **{col: row.get(col) for col in _IMMOBILE_BULK_COLUMNS[3:]},
+        }
+        values["sub"] = row.get("sub") or ""
+
+        # Один VALUES не може двічі зачепити той самий рядок у ON CONFLICT:
+        # зливаємо дублікати так само, як це зробили б послідовні upsert-и (COALESCE)
+        key = (foglio, numero, values["sub"])
+        prev = merged.get(key)
+        if prev is None:
+            merged[key] = values
+        else:
+            for col, val in values.items():
+                if val is not None and col not in _IMMOBILE_INSERT_ONLY:
+                    prev[col] = val
+
+    if not merged:
+        return []
+
+    rows = [tuple(v[col] for col in _IMMOBILE_BULK_COLUMNS) for v in merged.values()]
+
+    try:
+        with conn.cursor() as cur:
+            if len(rows) >= IMMOBILI_COPY_THRESHOLD:
+                return _upsert_immobili_via_copy(cur, rows)
+            result = psycopg2.extras.execute_values(
+                cur,
+                _IMMOBILE_BULK_INSERT_SQL,
+                rows,
+                page_size=1000,
+                fetch=True,
+            )
+            return [r[0] for r in result]
+    except Psycopg2Error as e:
+        logger.error(f"[DB] Bulk immobile upsert failed for CF={owner_cf} ({len(rows)} rows): {e}")
+        raise
+
+
+def _upsert_immobili_via_copy(cur, rows: List[Tuple[Any, ...]]) -> List[int]:
+    """
+    Великі батчі: COPY FROM STDIN у тимчасову staging-таблицю (без SQL-парсера
+    на кожен рядок), далі один INSERT ... SELECT ... ON CONFLICT.
+    COPY сам по собі ON CONFLICT не підтримує, тому staging обов'язковий.
+    """
+    buf = io.StringIO()
+    # NULL кодуємо як \N (NULL '\N' у COPY), щоб '' лишався порожнім рядком (sub)
+    csv.writer(buf).writerows(
+        tuple(r"\N" if v is None else v for v in row) for row in rows
+    )
+    buf.seek(0)
+
+    cur.execute("DROP TABLE IF EXISTS pg_temp._immobili_stage;")
+    cur.execute(_IMMOBILE_STAGE_CREATE_SQL)
+    cur.copy_expert(_IMMOBILE_STAGE_COPY_SQL, buf)
+    cur.execute(_IMMOBILE_STAGE_UPSERT_SQL)
+    return [r[0] for r in cur.fetchall()]
+
+
 # 4.2 Upsert Immobile Elements
 def db_upsert_immobile_elements(conn, immobile_id: int, adapter: ItemAdapter):
     """
@@ -424,50 +597,69 @@ def db_upsert_immobile_elements(conn, immobile_id: int, adapter: ItemAdapter):
     - Якщо є значення -> оновлюємо або вставляємо.
     """
     
-    # Список всіх можливих ключів елементів, щоб нічого не пропустити
-    all_keys = (
-        ["a1", "a2"]
-        + [f"b{i}" for i in range(1, 6)]
-        + [f"c{i}" for i in range(1, 8)]
-        + [f"d{i}" for i in range(1, 14)]
-    )
+    to_delete: List[Tuple[str, str]] = []
+    to_upsert: List[Tuple[str, str, str]] = []
 
-    with conn.cursor() as cur:
-        for key in all_keys:
-            # Отримуємо "сире" значення з YAML
-            raw_val = adapter.get(key)
+    for key in ELEMENT_KEYS:
+        # Отримуємо "сире" значення з YAML
+        raw_val = adapter.get(key)
 
-            # 1. Якщо в YAML ключ пропущений — пропускаємо (зберігаємо те, що вже є в БД)
-            if raw_val is None:
-                continue
+        # 1. Якщо в YAML ключ пропущений — пропускаємо (зберігаємо те, що вже є в БД)
+        if raw_val is None:
+            continue
 
-            val = str(raw_val).strip()
-            
-            # Парсимо групу і код (наприклад, key='d12' -> grp='D', code='12')
-            grp = key[0].upper()
-            code = key[1:]
+        val = str(raw_val).strip()
+
+        # Парсимо групу і код (наприклад, key='d12' -> grp='D', code='12')
+        grp = key[0].upper()
+        code = key[1:]
+
+        # 2. Якщо значення "-", це команда на видалення
+        if val == "-":
+            to_delete.append((grp, code))
+        # 3. Якщо є будь-яке інше значення (наприклад "X"), записуємо/оновлюємо
+        elif val:
+            to_upsert.append((grp, code, val))
+
+    if not to_delete and not to_upsert:
+        return
+
+    # DELETE і UPSERT одним statement (CTE) — один round-trip замість запиту на кожен ключ.
+    # Ключі для видалення й оновлення не перетинаються, тож конфлікту в CTE немає.
+    with conn.cursor() as cur:
+        cur.execute(
+            """
+            WITH del AS (
+                DELETE FROM public.immobile_elements e
+                USING unnest(%(del_grp)s::text[], %(del_code)s::text[]) AS d(grp, code)
+                WHERE e.immobile_id = %(immobile_id)s AND e.grp = d.grp AND e.code = d.code
+            )
+            INSERT INTO public.immobile_elements (immobile_id, grp, code, value)
+            SELECT %(immobile_id)s, u.grp, u.code, u.value
+            FROM unnest(%(up_grp)s::text[], %(up_code)s::text[], %(up_val)s::text[]) AS u(grp, code, value)
+            ON CONFLICT (immobile_id, grp, code)
+            DO UPDATE SET value = EXCLUDED.value
+            """,
+            {
+                "immobile_id": immobile_id,
+                "del_grp": [g for g, _ in to_delete],
+                "del_code": [c for _, c in to_delete],
+                "up_grp": [g for g, _, _ in to_upsert],
+                "up_code": [c for _, c, _ in to_upsert],
+                "up_val": [v for _, _, v in to_upsert],
+            },
+        )
 
-            # 2. Якщо значення "-", це команда на видалення
-            if val == "-":
-                cur.execute(
-                    """
-                    DELETE FROM public.immobile_elements 
-                    WHERE immobile_id = %s AND grp = %s AND code = %s
-                    """,
-                    (immobile_id, grp, code)
-                )
-            
-            # 3. Якщо є будь-яке інше значення (наприклад "X"), записуємо/оновлюємо
-            elif val:
-                cur.execute(
-                    """
-                    INSERT INTO public.immobile_elements (immobile_id, grp, code, value)
-                    VALUES (%s, %s, %s, %s)
-                    ON CONFLICT (immobile_id, grp, code) 
-                    DO UPDATE SET value = EXCLUDED.value
-                    """,
-                    (immobile_id, grp, code, val)
-                )
+
+@lru_cache(maxsize=None)
+def _immobile_update_sql(updates: Tuple[str, ...]) -> str:
+    # Наборів SET-клауз лише кілька (адреса × energy_class), тож текст UPDATE
+    # збирається один раз на форму, а не на кожен immobile
+    return f"""
+    UPDATE public.immobili 
+    SET {', '.join(updates)}, updated_at = now()
+    WHERE id = %s
+    """
 
 
 def db_update_immobile_real_address(
@@ -509,11 +701,7 @@ def db_update_immobile_real_address(
     if not updates:
         return
 
-    sql = f"""
-    UPDATE public.immobili 
-    SET {', '.join(updates)}, updated_at = now()
-    WHERE id = %s
-    """
+    sql = _immobile_update_sql(tuple(updates))
     params.append(immobile_id)
 
     with conn.cursor() as cur:
@@ -533,78 +721,68 @@ def db_load_immobili(conn, owner_cf: str) -> List[Tuple[int, Immobile]]:
     Примітка: Ця функція також підтягує дані з joined таблиць адрес, 
     щоб заповнити поля Immobile об'єкта (для сумісності з пайплайном).
     """
+    return db_load_immobili_many(conn, [owner_cf]).get(owner_cf, [])
+
+
+def db_load_immobili_many(conn, owner_cfs: List[str]) -> Dict[str, List[Tuple[int, Immobile]]]:
+    """
+    Завантажує immobile одразу для кількох власників одним запитом (ANY(%s)).
+    Повертає {owner_cf: [(id, Immobile), ...]}; CF без immobili у результаті відсутні.
+    """
+    cfs = list(dict.fromkeys(cf for cf in owner_cfs if cf))
+    if not cfs:
+        return {}
+
+    # Колонки одразу аліасимо в імена полів Immobile, щоб рядок можна було
+    # передати як Immobile(**row). Пріоритет: Реальна адреса > Адреса візури
     sql = """
     SELECT
-      i.id,
+      i.id, i.owner_cf,
       -- Кадастрові дані
       i.sez_urbana, i.foglio, i.numero, i.sub,
       i.zona_cens, i.micro_zona, i.categoria, i.classe, i.consistenza, i.rendita,
-      i.superficie_totale, i.superficie_escluse, i.superficie_raw,
+      -- 0 трактуємо як "немає площі", як і раніше
+      NULLIF(i.superficie_totale, 0)  AS superficie_totale,
+      NULLIF(i.superficie_escluse, 0) AS superficie_escluse,
+      i.superficie_raw,
+
+      -- Енергоклас (Master Data)
       i.energy_class,
-      
-      -- Адреса з візури (JOIN)
-      va.comune as v_comune, va.via_full as v_via, va.civico as v_civico, 
-      va.piano as v_piano, va.interno as v_interno, va.scala as v_scala,
-      
-      -- Реальна адреса (JOIN)
-      ra.comune as r_comune, ra.via_full as r_via, ra.civico as r_civico,
-      ra.piano as r_piano, ra.interno as r_interno
-      
+
+      -- Адреса з візури (JOIN); повну назву вулиці зберігаємо як via_full
+      va.comune   AS immobile_comune,
+      va.via_full AS via_name,
+      va.civico   AS via_num,
+      va.piano    AS piano,
+      va.interno  AS interno,
+      va.scala    AS scala,
+
+      -- Override поля (реальна адреса, JOIN)
+      ra.comune   AS immobile_comune_override,
+      ra.via_full AS immobile_via_override,
+      ra.civico   AS immobile_civico_override,
+      ra.piano    AS immobile_piano_override,
+      ra.interno  AS immobile_interno_override
+
     FROM public.immobili i
     LEFT JOIN public.addresses va ON i.visura_address_id = va.id
     LEFT JOIN public.addresses ra ON i.real_address_id = ra.id
-    WHERE i.owner_cf = %s
-    ORDER BY i.foglio, i.numero, i.sub;
+    WHERE i.owner_cf = ANY(%s)
+    ORDER BY i.owner_cf, i.foglio, i.numero, i.sub;
     """
-    
-    with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cur:
-        cur.execute(sql, (owner_cf,))
-        rows = cur.fetchall()
 
-    out: List[Tuple[int, Immobile]] = []
-    for r in rows:
-        d = dict(r)
-        imm_id = int(d.pop("id"))
-        
-        # Мапимо поля з БД назад у структуру Immobile для сумісності з кодом генератора
-        # Пріоритет: Реальна адреса > Адреса візури
-        
-        imm_obj = Immobile(
-            # Кадастрові
-            sez_urbana=d['sez_urbana'],
-            foglio=d['foglio'],
-            numero=d['numero'],
-            sub=d['sub'],
-            zona_cens=d['zona_cens'],
-            micro_zona=d['micro_zona'],
-            categoria=d['categoria'],
-            classe=d['classe'],
-            consistenza=d['consistenza'],
-            rendita=d['rendita'],
-            superficie_totale=float(d['superficie_totale']) if d['superficie_totale'] else None,
-            superficie_escluse=float(d['superficie_escluse']) if d['superficie_escluse'] else None,
-            superficie_raw=d['superficie_raw'],
-            
-            # Енергоклас (Master Data)
-            energy_class=d['energy_class'],
-            
-            # Поля адреси для візури (заповнюємо з візурної адреси)
-            immobile_comune=d['v_comune'],
-            via_name=d['v_via'], # Ми зберігаємо повну назву як via_full
-            via_num=d['v_civico'],
-            piano=d['v_piano'],
-            interno=d['v_interno'],
-            scala=d['v_scala'],
-            
-            # Override поля (реальна адреса)
-            immobile_comune_override=d['r_comune'],
-            immobile_via_override=d['r_via'],
-            immobile_civico_override=d['r_civico'],
-            immobile_piano_override=d['r_piano'],
-            immobile_interno_override=d['r_interno']
-        )
-        out.append((imm_id, imm_obj))
-        
+    # RealDictCursor одразу віддає dict — без DictRow і копії dict(r) на кожен рядок.
+    # Іменований (server-side) курсор стрімить рядки пачками по itersize,
+    # тож у пам'яті не тримаємо одночасно весь fetchall() і список Immobile.
+    out: Dict[str, List[Tuple[int, Immobile]]] = {}
+    with conn.cursor(name="immobili_stream", cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+        cur.itersize = IMMOBILI_STREAM_ITERSIZE
+        cur.execute(sql, (cfs,))
+        for d in cur:
+            imm_id = int(d.pop("id"))
+            cf = d.pop("owner_cf")
+            out.setdefault(cf, []).append((imm_id, Immobile(**d)))
+
     return out
 
 
@@ -2,16 +2,19 @@
 from __future__ import annotations
 
 import logging
+import os
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from operator import attrgetter
 from pathlib import Path
 from typing import List, Optional, Tuple
 
 from itemadapter import ItemAdapter
 from decouple import config
 
-from uppi.domain.db import get_pg_connection
+from uppi.domain.db import get_pooled_connection, release_pooled_connection
 from uppi.domain.immobile import Immobile
 from uppi.domain.object_storage import ObjectStorage
-from uppi.domain.storage import get_attestazione_path, get_client_dir, get_visura_path
+from uppi.domain.storage import client_dir_path, get_attestazione_path, get_visura_path
 from uppi.parsers.visura_pdf_parser import VisuraParser
 from uppi.services.attestazione_generator import build_template_params
 from uppi.services.db_repo import (
@@ -19,7 +22,7 @@ from uppi.services.db_repo import (
     db_upsert_immobile_elements,
     db_upsert_person,
     db_upsert_visura,
-    db_upsert_immobile,
+    db_upsert_immobili_bulk,
     db_update_immobile_real_address,
     db_upsert_contract,
     db_load_immobili,
@@ -46,6 +49,14 @@ TEMPLATE_VERSION = config("TEMPLATE_VERSION", default="pescara2018_v2").strip()
 PRUNE_OLD_IMMOBILI_WITHOUT_CONTRACTS = config("PRUNE_OLD_IMMOBILI_WITHOUT_CONTRACTS",
                                               default="True").strip().lower() == "true"
 DELETE_LOCAL_VISURA_AFTER_UPLOAD = config("DELETE_LOCAL_VISURA_AFTER_UPLOAD", default="False").strip().lower() == "true"
+VISURA_UPLOAD_WORKERS = config("VISURA_UPLOAD_WORKERS", default=4, cast=int)
+DOCX_WORKERS = config("DOCX_WORKERS", default=min(8, os.cpu_count() or 4), cast=int)
+
+# Upload візури в S3 йде у фоні паралельно з роботою в БД (різні сервіси, незалежний I/O)
+_UPLOAD_EXECUTOR = ThreadPoolExecutor(max_workers=VISURA_UPLOAD_WORKERS, thread_name_prefix="uppi-upload")
+# Генерація DOCX (zip/DEFLATE + запис на диск) і upload атестацій — паралельно по immobili;
+# записи в БД лишаються в потоці item-а, бо конекшн між потоками не ділимо
+_DOCX_EXECUTOR = ThreadPoolExecutor(max_workers=DOCX_WORKERS, thread_name_prefix="uppi-docx")
 
 
 def find_local_visura_pdf(cf: str, adapter: ItemAdapter) -> Optional[Path]:
@@ -60,7 +71,7 @@ def find_local_visura_pdf(cf: str, adapter: ItemAdapter) -> Optional[Path]:
     if fallback.exists():
         return fallback
 
-    client_dir = get_client_dir(cf)
+    client_dir = client_dir_path(cf)
     # Шукаємо за префіксом DOC_ або просто найновіший PDF
     candidates = sorted(client_dir.glob("DOC_*.pdf"), key=lambda x: x.stat().st_mtime, reverse=True)
     if candidates:
@@ -79,18 +90,23 @@ def filter_immobiles_by_yaml(immobiles: List[Tuple[int, Immobile]], adapter: Ite
     numero_f = clean_str(adapter.get("numero"))
     sub_f = clean_str(adapter.get("sub"))
 
-    out: List[Tuple[int, Immobile]] = []
-    for imm_id, imm in immobiles:
-        # Порівнюємо кадастрові ідентифікатори (основний спосіб матчингу)
-        if foglio_f and str(getattr(imm, "foglio", "") or "") != foglio_f:
-            continue
-        if numero_f and str(getattr(imm, "numero", "") or "") != numero_f:
-            continue
-        if sub_f and str(getattr(imm, "sub", "") or "") != sub_f:
-            continue
-
-        out.append((imm_id, imm))
-        logger.debug("[PIPELINE] Immobile ID=%s matched YAML criteria", imm_id)
+    # Без фільтрів у YAML підходять усі — не проходимо список взагалі
+    if not (foglio_f or numero_f or sub_f):
+        return list(immobiles)
+
+    # Порівнюємо кадастрові ідентифікатори (основний спосіб матчингу) одним
+    # порівнянням кортежу по активних фільтрах. Поля в БД — TEXT, тож str()
+    # не потрібен, а None ніколи не дорівнює непорожньому фільтру.
+    active = [(name, value) for name, value in (("foglio", foglio_f), ("numero", numero_f), ("sub", sub_f)) if value]
+    key_of = attrgetter(*(name for name, _ in active))
+    wanted = tuple(value for _, value in active)
+    if len(wanted) == 1:
+        # attrgetter з одним полем повертає значення, а не кортеж
+        wanted = wanted[0]
+
+    out = [pair for pair in immobiles if key_of(pair[1]) == wanted]
+    # Один підсумковий рядок замість логу на кожен immobile
+    logger.debug("[PIPELINE] YAML filter kept %d/%d immobili", len(out), len(immobiles))
     return out
 
 
@@ -101,6 +117,23 @@ class VisuraProcessor:
         self.template_path = template_path or (
                 Path(__file__).resolve().parents[2] / "attestazione_template" / "template_attestazione_pescara.docx"
         )
+        # Парсер не тримає стану між parse(), тож один екземпляр на процесор
+        self.parser = VisuraParser()
+        self._template_path_str = str(self.template_path)
+
+    def _render_and_upload_attestazione(self, params: dict, output_path: Path, out_bucket: str, out_obj: str) -> None:
+        """Заповнює DOCX-шаблон і вантажить результат у S3 (виконується в _DOCX_EXECUTOR)."""
+        fill_attestazione_template(
+            template_path=self._template_path_str,
+            output_folder=str(output_path.parent),
+            filename=output_path.name,
+            params=params,
+            underscored=underscored,
+        )
+        self.storage_service.upload_file(
+            out_bucket, out_obj, output_path,
+            content_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+        )
 
     def process_item(self, item, spider):
         adapter = ItemAdapter(item)
@@ -111,9 +144,40 @@ class VisuraProcessor:
             return item
 
         cond_cf = clean_str(adapter.get("conduttore_cf"))
-        conn = get_pg_connection()
+        conn = None
+        upload_future: Future | None = None
+        # (contract_id, immobile_id, imm, contract_ctx, canone_result, bucket, object, future)
+        pending_docs: List[tuple] = []
 
         try:
+            # --- ЕТАП 0: РОБОТА З ФАЙЛОМ ВІЗУРИ (БЕЗ БД) ---
+            # Пошук PDF, checksum, старт upload і парсинг (CPU) робимо до того,
+            # як взяти конекшн: транзакція й row locks не тримаються, поки парсимо PDF
+
+            visura_source = clean_str(adapter.get("visura_source"))
+            visura_downloaded = bool(adapter.get("visura_downloaded"))
+            pdf_path = None
+            checksum = None
+            parsed_dicts: List[dict] = []
+
+            if visura_source == "sister" and visura_downloaded:
+                pdf_path = find_local_visura_pdf(locatore_cf, adapter)
+                if pdf_path:
+                    checksum = sha256_file(pdf_path)
+
+                    # Не чекаємо upload тут: парсинг і запис у БД ідуть паралельно,
+                    # результат забираємо перед commit (помилка upload -> rollback)
+                    upload_future = _UPLOAD_EXECUTOR.submit(
+                        self.storage_service.upload_file,
+                        self.storage.cfg.visure_bucket,
+                        self.storage.visura_object_name(locatore_cf),
+                        pdf_path,
+                        content_type="application/pdf",
+                    )
+                    parsed_dicts = self.parser.parse(pdf_path)
+
+            conn = get_pooled_connection()
+
             # --- ЕТАП 1: АДРЕСИ ТА ПЕРСОНИ (LOCATORE / CONDUTTORE) ---
 
             # 1.1. Адреса Locatore
@@ -152,23 +216,16 @@ class VisuraProcessor:
                     address_id=cond_addr_id
                 )
 
-            # --- ЕТАП 2: ЗАВАНТАЖЕННЯ ТА ПАРСИНГ ВІЗУРИ ---
+            # --- ЕТАП 2: МЕТАДАНІ ВІЗУРИ ---
 
-            visura_source = clean_str(adapter.get("visura_source"))
-            visura_downloaded = bool(adapter.get("visura_downloaded"))
-            pdf_path = None
             fetched_now = False
             visura_db_id = None
             pdf_to_delete: Path | None = None
 
             if visura_source == "sister" and visura_downloaded:
-                pdf_path = find_local_visura_pdf(locatore_cf, adapter)
                 if pdf_path:
-                    checksum = sha256_file(pdf_path)
                     bucket = self.storage.cfg.visure_bucket
                     obj_name = self.storage.visura_object_name(locatore_cf)
-
-                    self.storage_service.upload_file(bucket, obj_name, pdf_path, content_type="application/pdf")
                     fetched_now = True
                     visura_db_id = db_upsert_visura(conn, locatore_cf, bucket, obj_name, checksum, fetched_now=True)
                     pdf_to_delete = pdf_path
@@ -183,8 +240,7 @@ class VisuraProcessor:
 
             keep_ids: List[int] = []
             if fetched_now and pdf_path:
-                parser = VisuraParser()
-                parsed_dicts = parser.parse(pdf_path)
+                # parsed_dicts вже отримано на етапі 0, поза транзакцією
 
                 # Оновлюємо інформацію про Locatore з візури
                 if parsed_dicts:
@@ -202,6 +258,7 @@ class VisuraProcessor:
                         address_id=loc_addr_id
                     )
 
+                to_upsert: List[Tuple[Immobile, Optional[int]]] = []
                 for d in parsed_dicts:
                     # А. Зберігаємо адресу з візури
                     v_addr_id = db_upsert_address(conn, {
@@ -212,15 +269,13 @@ class VisuraProcessor:
                         "interno": d.get("interno"),
                         "scala": d.get("scala")
                     })
+                    to_upsert.append((immobile_from_parsed_dict(d), v_addr_id))
 
-                    # Б. Створюємо/оновлюємо Immobile Master Data
-                    imm_obj = immobile_from_parsed_dict(d)
-                    imm_id = db_upsert_immobile(
-                        conn, locatore_cf, imm_obj,
-                        visura_addr_id=v_addr_id,
-                        source_visura_id=visura_db_id
-                    )
-                    keep_ids.append(imm_id)
+                # Б. Створюємо/оновлюємо Immobile Master Data одним батчем
+                keep_ids = db_upsert_immobili_bulk(
+                    conn, locatore_cf, to_upsert,
+                    source_visura_id=visura_db_id
+                )
 
                 # Очистка старих записів без контрактів
                 if keep_ids:
@@ -232,18 +287,19 @@ class VisuraProcessor:
             immobili_db = db_load_immobili(conn, locatore_cf)
             selected = filter_immobiles_by_yaml(immobili_db, adapter)
 
-            for immobile_id, imm in selected:
-                # 4.1.1 Обробка "реальної" адреси об'єкта (якщо вказана в YAML як override)
-                real_addr_id = None
-                if adapter.get("immobile_comune") or adapter.get("immobile_via"):
-                    real_addr_id = db_upsert_address(conn, {
-                        "comune": adapter.get("immobile_comune"),
-                        "via_full": adapter.get("immobile_via"),
-                        "civico": adapter.get("immobile_civico"),
-                        "piano": adapter.get("immobile_piano"),
-                        "interno": adapter.get("immobile_interno")
-                    })
+            # 4.1.1 Обробка "реальної" адреси об'єкта (якщо вказана в YAML як override).
+            # Адреса однакова для всіх вибраних immobili — upsert один раз, а не на кожен
+            real_addr_id = None
+            if selected and (adapter.get("immobile_comune") or adapter.get("immobile_via")):
+                real_addr_id = db_upsert_address(conn, {
+                    "comune": adapter.get("immobile_comune"),
+                    "via_full": adapter.get("immobile_via"),
+                    "civico": adapter.get("immobile_civico"),
+                    "piano": adapter.get("immobile_piano"),
+                    "interno": adapter.get("immobile_interno")
+                })
 
+            for immobile_id, imm in selected:
                 # Оновлюємо Master Data нерухомості даними з YAML
                 db_update_immobile_real_address(
                     conn, immobile_id,
@@ -411,23 +467,20 @@ class VisuraProcessor:
                 output_path = get_attestazione_path(locatore_cf, contract_id, imm)
                 output_path.parent.mkdir(parents=True, exist_ok=True)
 
-                try:
-                    logger.debug(f"[DEBUG_ADDR] Contract CTX: {contract_ctx.get('immobile')}")
-                    fill_attestazione_template(
-                        template_path=str(self.template_path),
-                        output_folder=str(output_path.parent),
-                        filename=output_path.name,
-                        params=params,
-                        underscored=underscored,
-                    )
-
-                    out_bucket = self.storage.cfg.attestazioni_bucket
-                    out_obj = self.storage.attestazione_object_name(locatore_cf, contract_id)
+                logger.debug(f"[DEBUG_ADDR] Contract CTX: {contract_ctx.get('immobile')}")
+                out_bucket = self.storage.cfg.attestazioni_bucket
+                out_obj = self.storage.attestazione_object_name(locatore_cf, contract_id)
+                doc_future = _DOCX_EXECUTOR.submit(
+                    self._render_and_upload_attestazione, params, output_path, out_bucket, out_obj
+                )
+                pending_docs.append(
+                    (contract_id, immobile_id, imm, contract_ctx, canone_result_snapshot, out_bucket, out_obj, doc_future)
+                )
 
-                    self.storage_service.upload_file(
-                        out_bucket, out_obj, output_path,
-                        content_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-                    )
+            # Результати генерації логуємо в БД у тому ж порядку, що й immobili
+            for contract_id, immobile_id, imm, contract_ctx, canone_result_snapshot, out_bucket, out_obj, doc_future in pending_docs:
+                try:
+                    doc_future.result()
 
                     # Створюємо детальний знімок даних для аудиту
                     # Тут ми використовуємо immobile_db_row, щоб отримати очищені дані
@@ -467,6 +520,9 @@ class VisuraProcessor:
                         template_version=TEMPLATE_VERSION
                     )
 
+            if upload_future is not None:
+                upload_future.result()
+
             conn.commit()
 
             # Очистка тимчасових файлів
@@ -477,9 +533,17 @@ class VisuraProcessor:
 
         except Exception as e:
             spider.logger.exception("[PIPELINE] Fatal error processing CF %s: %s", locatore_cf, e)
+            # Фонові upload-и/DOCX цього item-а: що ще не стартувало — скасовуємо,
+            # що вже йде — дочікуємось, і лише тоді відкочуємо транзакцію
+            futures = [doc[-1] for doc in pending_docs]
+            if upload_future is not None:
+                futures.append(upload_future)
+            for fut in futures:
+                fut.cancel()
+            wait(futures)
             if conn:
                 conn.rollback()
             return item
         finally:
             if conn:
-                conn.close()
+                release_pooled_connection(conn)
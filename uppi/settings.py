@@ -1,5 +1,7 @@
 import os
 
+from decouple import config
+
 BOT_NAME = "uppi"
 
 SPIDER_MODULES = ["uppi.spiders"]
@@ -8,6 +10,9 @@ NEWSPIDER_MODULE = "uppi.spiders"
 # === Scrapy Performance Settings ===
 CONCURRENT_REQUESTS = 1
 DOWNLOAD_DELAY = 1
+# Помірне значення: великий CONCURRENT_ITEMS лише збільшує чергу item-ів,
+# реальну паралельність pipeline обмежує PIPELINE_WORKERS
+CONCURRENT_ITEMS = 32
 
 USER_AGENT = None
 
@@ -46,7 +51,8 @@ PLAYWRIGHT_CONTEXTS = {
         # "storage_state": "state.json",
     }
 }
-if os.path.exists("state.json"):
+# Перевикористовуємо збережену сесію AE, якщо не вимагається примусовий логін
+if not config("AE_FORCE_LOGIN", default=False, cast=bool) and os.path.exists("state.json"):
     PLAYWRIGHT_CONTEXTS["default"]["storage_state"] = "state.json"
 
 
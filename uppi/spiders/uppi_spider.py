@@ -3,7 +3,7 @@
 
 Логіка:
 - start():
-    - чистить state.json та captcha_images
+    - чистить captcha_images (і state.json, якщо AE_FORCE_LOGIN)
     - читає clients.yml
     - для тих, у кого візура вже є в БД і не FORCE_UPDATE_VISURA — не чіпає SISTER, просто yield UppiItem
     - для решти — додає в self.clients_to_fetch
@@ -20,6 +20,7 @@
     - наприкінці завжди робить logout (через кнопку або URL)
 """
 
+import asyncio
 import os
 import shutil
 from typing import Any, Dict, List, Optional
@@ -29,19 +30,19 @@ from decouple import config
 from playwright.async_api import Page, TimeoutError as PlaywrightTimeoutError
 
 from uppi.ae.auth import authenticate_user
-from uppi.ae.captcha import solve_captcha_if_present
+from uppi.ae.captcha import prepare_captcha_dirs, solve_captcha_if_present
 from uppi.ae.download import download_document
-from uppi.ae.sister_navigation import open_sister_service, navigate_to_visure_catastali
+from uppi.ae.sister_navigation import SisterForm, open_sister_service, navigate_to_visure_catastali
 from uppi.ae.uppi_selectors import UppiSelectors
 from uppi.config import AppConfig
 from uppi.domain.clients import load_clients
-from uppi.domain.db import get_pg_connection
+from uppi.domain.db import pooled_connection
 from uppi.items import UppiItem
-from uppi.services.db_repo import fetch_visura_state
+from uppi.services.db_repo import VisuraState, fetch_visura_states_many
 from uppi.services.storage_minio import StorageService
-from uppi.services.visura_policy import should_download_visura
+from uppi.services.visura_policy import VisuraDecision, should_download_visura
 from uppi.utils.item_mapper import map_yaml_to_item
-from uppi.utils.playwright_helpers import apply_stealth, log_requests, get_webgl_vendor
+from uppi.utils.playwright_helpers import apply_stealth, block_heavy_resources, log_requests, get_webgl_vendor
 from uppi.utils.stealth import STEALTH_SCRIPT
 
 # Конфіг з env
@@ -54,6 +55,12 @@ AE_USERNAME = config("AE_USERNAME")
 AE_PASSWORD = config("AE_PASSWORD")
 AE_PIN = config("AE_PIN")
 
+# Примусовий логін через форму: state.json видаляється на старті і не перевикористовується
+AE_FORCE_LOGIN = config("AE_FORCE_LOGIN", default=False, cast=bool)
+
+# Скільки клієнтів одночасно перевіряємо в БД/MinIO на старті
+VISURA_CHECK_CONCURRENCY = config("VISURA_CHECK_CONCURRENCY", default=4, cast=int)
+
 
 class UppiSpider(scrapy.Spider):
     name = "uppi"
@@ -66,21 +73,24 @@ class UppiSpider(scrapy.Spider):
         """
         Стартова точка павука (Scrapy 2.13 async start).
 
-        - видаляє старий state.json + captcha_images
+        - видаляє captcha_images (і старий state.json, якщо AE_FORCE_LOGIN)
         - завантажує клієнтів
         - вирішує, для кого потрібен SISTER, а для кого ні
         - якщо SISTER потрібен хоча б для одного — стартує Playwright-логін
         """
         self.logger.info("[START] UppiSpider starting...")
 
-        # Чистимо старий state.json
-        self.logger.info("[START] Cleaning old state.json if present")
-        try:
-            if os.path.exists("state.json"):
+        # state.json залишаємо для повторного використання сесії AE,
+        # чистимо лише при примусовому логіні
+        if AE_FORCE_LOGIN:
+            self.logger.info("[START] AE_FORCE_LOGIN set, cleaning old state.json if present")
+            try:
                 os.remove("state.json")
                 self.logger.info("[START] Old state.json removed")
-        except Exception as e:
-            self.logger.warning("[START] Failed to remove state.json: %s", e)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                self.logger.warning("[START] Failed to remove state.json: %s", e)
 
         # Чистимо папку captcha_images
         self.logger.info("[START] Cleaning old captcha_images folder if present")
@@ -103,42 +113,39 @@ class UppiSpider(scrapy.Spider):
         app_config = AppConfig.from_env()
         storage_service = StorageService()
 
-        # Вирішуємо, кого потрібно качати з SISTER
+        valid_clients: List[Dict[str, Any]] = []
         for client in clients:
-            cf = client.get("LOCATORE_CF")
-            if not cf:
+            if not client.get("LOCATORE_CF"):
                 self.logger.error("[START] Client without LOCATORE_CF in clients.yml: %r", client)
                 continue
+            valid_clients.append(client)
 
-            force_update = bool(client.get("FORCE_UPDATE_VISURA"))
+        # Стан візур у БД тягнемо одним запитом на всіх клієнтів замість N round-trip'ів
+        db_states = await asyncio.to_thread(
+            self._fetch_db_states,
+            [client["LOCATORE_CF"] for client in valid_clients],
+        )
 
-            try:
-                conn = get_pg_connection()
-                try:
-                    db_state = fetch_visura_state(conn, cf)
-                    conn.commit()
-                finally:
-                    conn.close()
-            except Exception as e:
-                self.logger.exception("[DB] Error checking visura presence for %s: %s", cf, e)
-                # Якщо БД не відповіла — краще спробувати сходити в SISTER, ніж пропустити
-                db_state = None
+        # Перевірки MinIO блокуючі й незалежні між клієнтами —
+        # запускаємо їх у потоках паралельно, обмежуючи семафором
+        semaphore = asyncio.Semaphore(VISURA_CHECK_CONCURRENCY)
+
+        async def decide(client: Dict[str, Any]) -> VisuraDecision:
+            async with semaphore:
+                return await asyncio.to_thread(
+                    self._visura_decision,
+                    client,
+                    app_config.visura_cache.ttl_days,
+                    storage_service,
+                    db_states,
+                )
 
-            bucket = storage_service.storage.cfg.visure_bucket
-            obj_name = storage_service.storage.visura_object_name(cf)
-            minio_exists = False
-            try:
-                minio_exists = storage_service.object_exists(bucket, obj_name)
-            except Exception as e:
-                self.logger.warning("[S3] Cannot check visura object %s/%s: %s", bucket, obj_name, e)
-                minio_exists = False
-
-            decision = should_download_visura(
-                force_update=force_update,
-                ttl_days=app_config.visura_cache.ttl_days,
-                db_state=db_state,
-                minio_exists=minio_exists,
-            )
+        decisions = await asyncio.gather(*(decide(client) for client in valid_clients))
+
+        # Вирішуємо, кого потрібно качати з SISTER
+        for client, decision in zip(valid_clients, decisions):
+            cf = client.get("LOCATORE_CF")
+            force_update = bool(client.get("FORCE_UPDATE_VISURA"))
 
             if not decision.should_download:
                 # Візура вже є в БД — SISTER не чіпаємо
@@ -186,6 +193,50 @@ class UppiSpider(scrapy.Spider):
             dont_filter=True,
         )
 
+    def _fetch_db_states(self, cfs: List[str]) -> Dict[str, VisuraState]:
+        """
+        Синхронно тягне стан візур з БД для всіх CF одним запитом.
+        Виконується в окремому потоці з start().
+        """
+        try:
+            with pooled_connection(autocommit=True) as conn:
+                return fetch_visura_states_many(conn, cfs)
+        except Exception as e:
+            self.logger.exception("[DB] Error checking visura presence for %d clients: %s", len(cfs), e)
+            # Якщо БД не відповіла — краще спробувати сходити в SISTER, ніж пропустити
+            return {}
+
+    def _visura_decision(
+        self,
+        client: Dict[str, Any],
+        ttl_days: Optional[int],
+        storage_service: StorageService,
+        db_states: Dict[str, VisuraState],
+    ) -> VisuraDecision:
+        """
+        Синхронна перевірка кешу візури для одного клієнта (стан БД + MinIO).
+        Виконується в окремому потоці з start().
+        """
+        cf = client.get("LOCATORE_CF")
+        force_update = bool(client.get("FORCE_UPDATE_VISURA"))
+        db_state = db_states.get(cf)
+
+        bucket = storage_service.storage.cfg.visure_bucket
+        obj_name = storage_service.storage.visura_object_name(cf)
+        minio_exists = False
+        try:
+            minio_exists = storage_service.object_exists(bucket, obj_name)
+        except Exception as e:
+            self.logger.warning("[S3] Cannot check visura object %s/%s: %s", bucket, obj_name, e)
+            minio_exists = False
+
+        return should_download_visura(
+            force_update=force_update,
+            ttl_days=ttl_days,
+            db_state=db_state,
+            minio_exists=minio_exists,
+        )
+
     async def login_and_fetch_visura(self, response):
         """
         Playwright-callback:
@@ -202,6 +253,8 @@ class UppiSpider(scrapy.Spider):
         # Pre-navigation setup: stealth, логування запитів, WebGL
         try:
             await apply_stealth(page, STEALTH_SCRIPT)
+            # Лише на сторінці логіну AE: вкладку SISTER (де картинка CAPTCHA) не чіпаємо
+            await page.route("**/*", block_heavy_resources)
             await page.route("**", log_requests)
             vendor = await get_webgl_vendor(page)
             self.logger.debug("[LOGIN] WebGL vendor: %s", vendor)
@@ -217,6 +270,7 @@ class UppiSpider(scrapy.Spider):
                 ae_password=AE_PASSWORD,
                 ae_pin=AE_PIN,
                 logger=self.logger,
+                force=AE_FORCE_LOGIN,
             )
         except PlaywrightTimeoutError as err:
             self.logger.error("[LOGIN] Playwright timeout during login: %s", err)
@@ -247,6 +301,14 @@ class UppiSpider(scrapy.Spider):
             await self.safe_close_page(page, "login_page_after_failed_sister")
             return
 
+        # Локатори форми однакові для всіх CF у цій вкладці
+        sister_form = SisterForm(sister_page)
+
+        # Каталоги для скрінів CAPTCHA створюємо один раз на весь батч
+        captcha_dirs = prepare_captcha_dirs(
+            client.get("LOCATORE_CF") for client in self.clients_to_fetch
+        )
+
         # Основний цикл по клієнтах
         try:
             total = len(self.clients_to_fetch)
@@ -279,6 +341,7 @@ class UppiSpider(scrapy.Spider):
                     tipo_catasto=tipo_catasto,
                     ufficio_label=ufficio_label,
                     logger=self.logger,
+                    form=sister_form,
                 )
                 mapped["nav_to_visure_catastali"] = bool(nav_ok)
 
@@ -301,6 +364,7 @@ class UppiSpider(scrapy.Spider):
                     two_captcha_key=TWO_CAPTCHA_API_KEY,
                     logger=self.logger,
                     codice_fiscale=cf,
+                    captcha_dir=captcha_dirs.get(cf),
                 )
                 mapped["captcha_ok"] = bool(captcha_ok)
 
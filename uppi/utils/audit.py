@@ -11,6 +11,8 @@ from typing import Any, Optional
 
 logger = logging.getLogger(__name__)
 
+_WHITESPACE_RE = re.compile(r"\s+")
+
 
 def mask_username(login: str) -> str:
     """
@@ -117,7 +119,7 @@ def smart_title(text: Optional[str]) -> str:
         return ""
 
     # Зводимо множинні пробіли
-    s = re.sub(r"\s+", " ", s)
+    s = _WHITESPACE_RE.sub(" ", s)
 
     tokens = s.split(" ")
     out = [_smart_title_token(tok) for tok in tokens if tok != ""]
@@ -7,6 +7,9 @@ import re
 from datetime import date, datetime
 from typing import Any, Optional
 
+_ISO_DATE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+_IT_DATE_RE = re.compile(r"^\d{2}/\d{2}/\d{4}$")
+
 
 def clean_str(v: Any) -> Optional[str]:
     if v is None:
@@ -62,14 +65,14 @@ def parse_date(v: Any) -> Optional[date]:
     if not s:
         return None
 
-    if re.match(r"^\d{4}-\d{2}-\d{2}$", s):
+    if _ISO_DATE_RE.match(s):
         try:
             y, m, d = s.split("-")
             return date(int(y), int(m), int(d))
         except Exception:
             return None
 
-    if re.match(r"^\d{2}/\d{2}/\d{4}$", s):
+    if _IT_DATE_RE.match(s):
         try:
             d, m, y = s.split("/")
             return date(int(y), int(m), int(d))
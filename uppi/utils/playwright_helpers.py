@@ -1,5 +1,8 @@
 from playwright.async_api import Page
 
+# Типи ресурсів, які скраперу не потрібні (стилі лишаємо: від них залежить видимість елементів)
+BLOCKED_RESOURCE_TYPES = frozenset({"image", "font", "media"})
+
 async def apply_stealth(page: Page, script: str):
     await page.add_init_script(script)
     await page.context.grant_permissions(['geolocation'])
@@ -8,7 +11,15 @@ async def apply_stealth(page: Page, script: str):
 async def log_requests(route, request):
     """Log all requests made by the page."""
     print(f"📡 Request: {request.url} | Method: {request.method}")
-    await route.continue_()
+    # fallback, а не continue_: даємо відпрацювати раніше зареєстрованим роутам (block_heavy_resources)
+    await route.fallback()
+
+async def block_heavy_resources(route, request):
+    """Abort images/fonts/media. Не вішати на вкладку SISTER: там потрібна картинка CAPTCHA."""
+    if request.resource_type in BLOCKED_RESOURCE_TYPES:
+        await route.abort()
+    else:
+        await route.continue_()
 
 async def get_webgl_vendor(page: Page):
     return await page.evaluate("""() => {